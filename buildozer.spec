@@ -13,7 +13,7 @@ package.domain = org.daned
 source.dir = .
 
 # (list) Source files to include (let empty to include all the files)
-source.include_exts = py,png,jpg,jpeg,ttf,fb2,kv
+source.include_exts = py,png,jpg,jpeg,ttf,fb2,kv,tsv
 
 # (str) Application versioning (method 1)
 version = 1.3.0
@@ -26,7 +26,7 @@ icon.filename = LinguoBook_fixed.png
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy==2.3.0,pyjnius,android,deep-translator,requests,urllib3,openssl,certifi,beautifulsoup4,typing_extensions,kivymd==1.2.0
+requirements = python3,sqlite3,kivy==2.3.0,pyjnius,android,deep-translator,requests,urllib3,openssl,certifi,beautifulsoup4,typing_extensions,kivymd==1.2.0
 
 # (str) Supported orientation (landscape, portrait or all)
 orientation = portrait
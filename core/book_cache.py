@@ -0,0 +1,181 @@
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from kivy.app import App
+
+# Format pliku <book_id>.lbc (little-endian):
+#   nagłówek: magic(4s) wersja(H) zarezerwowane(H) liczba(I) offset_indeksu(Q)
+#   dane:     treści elementów w UTF-8, jedna za drugą
+#   indeks:   typ elementu (B) * liczba, potem offsety końców treści (I) * liczba
+CACHE_MAGIC = b"LBEC"
+CACHE_VERSION = 1
+_HEADER = struct.Struct("<4sHHIQ")
+
+# Format pliku <book_id>.lpi - indeks granic stron dla jednego układu:
+#   nagłówek: magic(4s) wersja(H) długość_układu(H) liczba_stron(I)
+#   układ:    sygnatura układu w UTF-8 (layout_signature)
+#   kotwice:  (indeks elementu(I), offset znaku(I)) * liczba_stron
+INDEX_MAGIC = b"LBPI"
+INDEX_VERSION = 1
+_INDEX_HEADER = struct.Struct("<4sHHI")
+_ANCHOR = struct.Struct("<II")
+
+_TYPE_CODES = {"title": 0, "paragraph": 1}
+_TYPE_NAMES = {code: name for name, code in _TYPE_CODES.items()}
+
+
+class CachedElements(Sequence):
+    """Lista elementów {'type', 'content'} czytana leniwie z pliku zmapowanego w pamięci."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, index_offset = _HEADER.unpack_from(self._mm, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported cache file: {path}")
+
+        self._count = count
+        self._types_offset = index_offset
+        self._ends_offset = index_offset + count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("element index out of range")
+
+        start = _HEADER.size
+        if index:
+            start += struct.unpack_from("<I", self._mm, self._ends_offset + 4 * (index - 1))[0]
+        end = _HEADER.size + struct.unpack_from("<I", self._mm, self._ends_offset + 4 * index)[0]
+
+        return {
+            'type': _TYPE_NAMES.get(self._mm[self._types_offset + index], "paragraph"),
+            'content': self._mm[start:end].decode("utf-8"),
+        }
+
+    def cumulative_sizes(self):
+        # Końce treści w bajtach prosto z indeksu, bez dekodowania tekstu
+        return list(struct.unpack_from(f"<{self._count}I", self._mm, self._ends_offset))
+
+    def close(self):
+        self._mm.close()
+
+
+class BookCache:
+    """Binarny cache sparsowanych książek, kluczowany ID z BookImportManager.generate_book_id."""
+
+    @staticmethod
+    def get_cache_dir():
+        app = App.get_running_app()
+        cache_dir = os.path.join(app.user_data_dir, "cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    @classmethod
+    def get_cache_path(cls, book_id):
+        return os.path.join(cls.get_cache_dir(), f"{book_id}.lbc")
+
+    @classmethod
+    def save(cls, book_id, elements):
+        path = cls.get_cache_path(book_id)
+        tmp_path = path + ".tmp"
+
+        types = bytearray()
+        ends = []
+        size = 0
+
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            for element in elements:
+                data = element.get('content', '').encode("utf-8")
+                f.write(data)
+                size += len(data)
+                types.append(_TYPE_CODES.get(element.get('type'), _TYPE_CODES["paragraph"]))
+                ends.append(size)
+
+            f.write(types)
+            f.write(struct.pack(f"<{len(ends)}I", *ends))
+
+            f.seek(0)
+            f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, 0, len(ends), _HEADER.size + size))
+
+        # Zamiana atomowa - przerwany zapis nie zostawi uszkodzonego cache
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, book_id):
+        """Zwraca CachedElements albo None, jeśli cache nie istnieje lub jest nieaktualny."""
+        path = cls.get_cache_path(book_id)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            elements = CachedElements(path)
+        except (ValueError, struct.error, OSError) as e:
+            print(f"Book cache error for {book_id}: {e}")
+            cls.remove(book_id)
+            return None
+
+        return elements if len(elements) else None
+
+    @classmethod
+    def get_index_path(cls, book_id):
+        return os.path.join(cls.get_cache_dir(), f"{book_id}.lpi")
+
+    @classmethod
+    def save_page_index(cls, book_id, layout, page_starts):
+        """Zapisuje kotwice początków stron (raz na paginację)."""
+        path = cls.get_index_path(book_id)
+        tmp_path = path + ".tmp"
+        layout_data = layout.encode("utf-8")
+
+        with open(tmp_path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(layout_data), len(page_starts)))
+            f.write(layout_data)
+            f.write(b"".join(_ANCHOR.pack(index, offset) for index, offset in page_starts))
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_page_index(cls, book_id, layout):
+        """Zwraca listę kotwic stron dla układu `layout` albo None."""
+        path = cls.get_index_path(book_id)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, layout_size, count = _INDEX_HEADER.unpack_from(data, 0)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"Unsupported page index: {path}")
+            start = _INDEX_HEADER.size
+            if data[start:start + layout_size].decode("utf-8") != layout:
+                # Indeks dla innego rozmiaru okna/czcionki
+                return None
+            anchors = list(_ANCHOR.iter_unpack(data[start + layout_size:]))
+            if len(anchors) != count:
+                raise ValueError(f"Truncated page index: {path}")
+            return anchors
+        except (ValueError, struct.error, OSError) as e:
+            print(f"Page index error for {book_id}: {e}")
+            return None
+
+    @classmethod
+    def remove(cls, book_id):
+        for path in (cls.get_cache_path(book_id), cls.get_index_path(book_id)):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error deleting cache {path}: {e}")
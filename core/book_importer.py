@@ -1,11 +1,19 @@
 import os
-import shutil
 import hashlib
-import re
-from bs4 import BeautifulSoup
+import tempfile
 from kivy.app import App
 
+from core.epub_loader import read_epub_metadata
+from core.fb2_archive import Fb2ZipStream, is_zip_name
+from core.fb2_metadata import Fb2MetadataParser, empty_metadata
+
+# Import czyta źródło porcjami po CHUNK_SIZE bajtów
+CHUNK_SIZE = 64 * 1024
+
+
 class BookImportManager:
+    # Książki z .fb2.zip zostają na dysku spakowane (<id>.fb2.zip)
+    keep_compressed = True
 
     @staticmethod
     def get_books_dir():
@@ -23,100 +31,83 @@ class BookImportManager:
                 h.update(chunk)
         return h.hexdigest()[:12]
 
-    @staticmethod
-    def extract_title_fb2(path):
-        try:
-            with open(path, "rb") as f:
-                raw = f.read()
-
-            for enc in ("utf-8", "utf-16", "windows-1250", "latin-1"):
-                try:
-                    text = raw.decode(enc)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                return None
-
-            text = re.sub(r'xmlns="[^"]+"', '', text, count=1)
-            soup = BeautifulSoup(text, "html.parser")
-
-            title = soup.find("book-title")
-            if title and title.get_text(strip=True):
-                return title.get_text(strip=True)
-        except Exception as e:
-            print("Title extract error:", e)
-
-        return None
-    
-    @staticmethod
-    def extract_author_fb2(path):
-        try:
-            # Czytamy binarnie, aby uniknąć problemów z kodowaniem (utf-8 vs windows-1250)
-            with open(path, "rb") as f:
-                # Czytamy większy fragment na wypadek długich opisów
-                raw_data = f.read(20000)
-            
-            # Zamieniamy na tekst, ignorując znaki spoza standardu
-            content = raw_data.decode('utf-8', errors='ignore')
-
-            # 1. Znajdź sekcję title-info (tam zawsze jest autor)
-            title_info = re.search(r'<title-info>(.*?)</title-info>', content, re.DOTALL | re.IGNORECASE)
-            if not title_info:
-                return "Unknown Author"
-            
-            section = title_info.group(1)
-
-            # 2. Znajdź blok autora wewnątrz title-info
-            author_match = re.search(r'<author>(.*?)</author>', section, re.DOTALL | re.IGNORECASE)
-            if author_match:
-                author_content = author_match.group(1)
-                
-                # Funkcja pomocnicza do wyciągania tekstu z tagów bez względu na wielkość liter
-                def get_tag(tag_name, text):
-                    m = re.search(f'<{tag_name}>(.*?)</{tag_name}>', text, re.DOTALL | re.IGNORECASE)
-                    return m.group(1).strip() if m else ""
-
-                first = get_tag('first-name', author_content)
-                middle = get_tag('middle-name', author_content)
-                last = get_tag('last-name', author_content)
-                nick = get_tag('nickname', author_content)
-
-                parts = [p for p in [first, middle, last] if p]
-                if parts:
-                    return " ".join(parts)
-                if nick:
-                    return nick
-
-        except Exception as e:
-            print(f"Błąd krytyczny extract_author: {e}")
-
-        return "Unknown Author"
-
     @classmethod
     def import_book(cls, source_path):
-        books_dir = cls.get_books_dir()
-        book_id = cls.generate_book_id(source_path)
-
-        ext = os.path.splitext(source_path)[1].lower() or ".fb2"
-        dest_path = os.path.join(books_dir, f"{book_id}{ext}")
-
-        if not os.path.exists(dest_path):
-            shutil.copyfile(source_path, dest_path)
-
-        title = cls.extract_title_fb2(dest_path)
-        if not title:
-            title = os.path.basename(source_path)
+        with open(source_path, "rb") as f:
+            return cls.import_stream(f, source_path)
 
-        # WYWOŁANIE NOWEJ METODY
-        author = cls.extract_author_fb2(dest_path)
-        print(f"DEBUG: Znalazłem autora: '{author}' dla pliku {source_path}")
+    @classmethod
+    def import_stream(cls, stream, name):
+        """Importuje książkę z obiektu z read(n) w jednym przebiegu.
+
+        Każda porcja jest naraz hashowana (ID książki), zapisywana do
+        katalogu books i przekazywana do Fb2MetadataParser (metadane z
+        <description>).
+        Z archiwum ZIP hashujemy i parsujemy rozpakowany plik FB2 (to samo ID
+        co dla tej książki bez kompresji), a na dysk trafia samo archiwum
+        albo - gdy keep_compressed jest wyłączone - rozpakowany FB2.
+        EPUB zapisujemy bez zmian, a metadane czytamy potem z jego OPF.
+        ID znamy dopiero na końcu, więc plik powstaje jako tymczasowy w tym
+        samym katalogu i dostaje docelową nazwę przez os.replace.
+        """
+        books_dir = cls.get_books_dir()
+        compressed = is_zip_name(name)
+        keep_archive = compressed and cls.keep_compressed
+        if compressed:
+            ext = ".fb2.zip" if keep_archive else ".fb2"
+        else:
+            ext = os.path.splitext(name)[1].lower() or ".fb2"
+        is_epub = ext == ".epub"
 
-        return {
-            "id": book_id,
-            "path": dest_path,
-            "title": title,
-            "author": author  
-        }
+        h = hashlib.sha256()
+        parser = None if is_epub else Fb2MetadataParser()
+        fd, tmp_path = tempfile.mkstemp(suffix=".import", dir=books_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                source = stream
+                if compressed:
+                    source = Fb2ZipStream(stream, sink=out if keep_archive else None)
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    if parser is not None:
+                        parser.feed(chunk)
+                    if not keep_archive:
+                        out.write(chunk)
+                if keep_archive:
+                    source.drain()
+
+            book_id = h.hexdigest()[:12]
+            dest_path = cls._existing_book_path(books_dir, book_id, ext)
+            if dest_path is not None:
+                # Ta sama książka zaimportowana wcześniej (także w innej postaci)
+                os.remove(tmp_path)
+            else:
+                dest_path = os.path.join(books_dir, f"{book_id}{ext}")
+                os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if parser is not None:
+            metadata = parser.result()
+        else:
+            try:
+                metadata = read_epub_metadata(dest_path)
+            except Exception as e:
+                print(f"EPUB metadata error {name}: {e}")
+                metadata = empty_metadata()
+        print(f"DEBUG: Znalazłem autora: '{metadata['author']}' dla pliku {name}")
+
+        book = {"id": book_id, "path": dest_path}
+        book.update(metadata)
+        book["title"] = metadata["title"] or os.path.basename(name)
+        return book
 
-    
+    @staticmethod
+    def _existing_book_path(books_dir, book_id, ext):
+        for candidate in (ext, ".fb2", ".fb2.zip"):
+            path = os.path.join(books_dir, f"{book_id}{candidate}")
+            if os.path.exists(path):
+                return path
+        return None
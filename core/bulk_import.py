@@ -0,0 +1,114 @@
+import os
+import queue
+import threading
+from kivy.clock import Clock
+from kivy.utils import platform
+
+from core.book_importer import BookImportManager
+from core.fb2_archive import ZIP_EXTENSIONS
+
+# Rozszerzenia plików importowanych z folderu
+BOOK_EXTENSIONS = (".fb2", ".epub") + ZIP_EXTENSIONS
+
+
+def is_book_file(name):
+    return name.lower().endswith(BOOK_EXTENSIONS)
+
+
+def folder_sources(directory):
+    """Źródła (otwórz, nazwa) dla książek w katalogu i jego podkatalogach."""
+    sources = []
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if is_book_file(filename):
+                path = os.path.join(root, filename)
+                sources.append((lambda p=path: open(p, "rb"), path))
+    return sources
+
+
+class BulkImporter:
+    """Import wielu książek naraz na kilku wątkach.
+
+    Każdy plik przechodzi przez BookImportManager.import_stream (hash, zapis
+    do books/ i metadane w jednym przebiegu). Postęp trafia do `on_progress`
+    w wątku Kivy, a na końcu `on_complete(books, failed, duplicates)` dostaje
+    książki bez duplikatów (to samo ID), nazwy plików z błędem i liczbę
+    pominiętych duplikatów - półka zapisuje książki jednym zapisem.
+    on_complete jest wołane zawsze, także po cancel() - z tym, co zdążyło
+    się zaimportować.
+    """
+
+    MAX_WORKERS = 4
+
+    def __init__(self, sources, on_progress, on_complete, max_workers=MAX_WORKERS):
+        self.total = len(sources)
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.max_workers = max(1, min(max_workers, self.total))
+
+        self._queue = queue.Queue()
+        for source in sources:
+            self._queue.put(source)
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._books = []
+        self._failed = []
+        self._done = 0
+        self._alive = 0
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        if not self.total:
+            self.on_complete([], [], 0)
+            return
+        self._alive = self.max_workers
+        for _ in range(self.max_workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _work(self):
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    opener, name = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                book = None
+                try:
+                    with opener() as stream:
+                        book = BookImportManager.import_stream(stream, name)
+                except Exception as e:
+                    print(f"Bulk import error {name}: {e}")
+
+                with self._lock:
+                    if book is not None:
+                        self._books.append(book)
+                    else:
+                        self._failed.append(name)
+                    self._done += 1
+                    progress = self._done / self.total * 100
+                    done = self._done
+                Clock.schedule_once(lambda dt, d=done, p=progress: self.on_progress(d, self.total, p))
+        finally:
+            if platform == "android":
+                # Wątek wołał Javę (ContentResolver) - musi się odłączyć od JVM
+                from jnius import detach
+                detach()
+            with self._lock:
+                self._alive -= 1
+                last = self._alive == 0
+            if last:
+                Clock.schedule_once(lambda dt: self._finish())
+
+    def _finish(self):
+        unique = {}
+        for book in self._books:
+            # Ta sama książka w kilku plikach - jeden wpis
+            unique.setdefault(book["id"], book)
+        self.on_complete(list(unique.values()), self._failed, len(self._books) - len(unique))
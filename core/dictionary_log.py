@@ -0,0 +1,120 @@
+import json
+import os
+
+# Opcjonalne pola wpisu obok tłumaczenia: język docelowy i model tłumaczenia
+ENTRY_FIELDS = ("target", "model")
+
+
+class DictionaryLog:
+    """Słownik zapisywany jako log zmian (JSON Lines), tylko dopisywany.
+
+    Każde add/delete dopisuje jedną linię na końcu pliku, więc koszt zapisu
+    nie zależy od wielkości słownika. Przy wczytaniu log jest odtwarzany do
+    pamięci; gdy ma dużo więcej linii niż słów, zapisujemy go od nowa
+    (kompaktowanie: plik tymczasowy + os.replace).
+    """
+
+    # Poniżej tylu linii logu nie kompaktujemy
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lines = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        damaged = False
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                self._lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Ucięta ostatnia linia po awarii - pomijamy
+                    damaged = True
+                    continue
+                self._apply(record)
+
+        if damaged:
+            # Kolejne wpisy nie mogą być doklejone do uszkodzonej linii
+            self.compact()
+        else:
+            self._maybe_compact()
+
+    def _apply(self, record):
+        word = record.get("word")
+        if record.get("op") == "del":
+            self._entries.pop(word, None)
+        else:
+            entry = {"translation": record.get("translation")}
+            entry.update((field, record[field]) for field in ENTRY_FIELDS if record.get(field) is not None)
+            self._entries[word] = entry
+
+    def _append(self, record):
+        self._apply(record)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._lines += 1
+        except OSError as e:
+            print(f"Dictionary write error: {e}")
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._lines > max(self.COMPACT_MIN_LINES, 2 * len(self._entries)):
+            self.compact()
+
+    def compact(self):
+        """Zapisuje log od nowa: jedna linia na słowo."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for word, entry in self._entries.items():
+                    record = {"op": "put", "word": word}
+                    record.update(entry)
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._lines = len(self._entries)
+        except OSError as e:
+            print(f"Dictionary compaction error: {e}")
+
+    def get_all(self):
+        return self._entries
+
+    @staticmethod
+    def _put_record(word, translation, extra):
+        record = {"op": "put", "word": word, "translation": translation}
+        record.update((field, value) for field, value in extra.items() if value is not None)
+        return record
+
+    def put(self, word, translation, **extra):
+        """extra: pola z ENTRY_FIELDS (target, model)."""
+        self._append(self._put_record(word, translation, extra))
+
+    def put_many(self, entries, **extra):
+        """Dopisuje wiele słów {słowo: tłumaczenie} jednym zapisem pliku."""
+        records = [self._put_record(word, translation, extra)
+                   for word, translation in entries.items()]
+        for record in records:
+            self._apply(record)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            self._lines += len(records)
+        except OSError as e:
+            print(f"Dictionary write error: {e}")
+        self._maybe_compact()
+
+    def delete(self, word):
+        if word in self._entries:
+            self._append({"op": "del", "word": word})
+
+    def import_entries(self, entries):
+        """Wczytuje słowa {słowo: {'translation', 'target', 'model'}} i zapisuje je jednym kompaktowaniem."""
+        for word, entry in entries.items():
+            self._apply(dict(entry, op="put", word=word))
+        self.compact()
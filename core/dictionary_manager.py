@@ -1,27 +1,117 @@
+from core.dictionary_log import DictionaryLog
 from kivy.storage.jsonstore import JsonStore
 import os
 
 class DictionaryManager:
-    def __init__(self, filename="dictionary.json"):
+    def __init__(self, filename="dictionary.json", backend="json", log_filename="dictionary.log"):
         base_dir = os.path.dirname(__file__)
         data_dir = os.path.join(base_dir, "..", "data")
         os.makedirs(data_dir, exist_ok=True)
+        json_path = os.path.join(data_dir, filename)
+        log_path = os.path.join(data_dir, log_filename)
 
-        self.store = JsonStore(os.path.join(data_dir, filename))
+        # Zbiór zapisanych słów (małymi literami) do zaznaczania na stronie
+        self._saved = None
 
-        if not self.store.exists("words"):
-            self.store.put("words", data={})
+        # Każde słowo to osobny wpis: wiersz SQLite albo linia logu,
+        # więc add/delete nie przepisują całego słownika
+        self.use_sqlite = backend == "sqlite"
+        if self.use_sqlite:
+            # sqlite3 ładujemy tylko dla tego backendu
+            from core.sqlite_store import SQLiteStore, default_database_path
+            self.store = SQLiteStore(default_database_path(), "words")
+            if os.path.exists(log_path):
+                # Ostatnio działał log (backend JSON) - to on ma aktualne słowa
+                self._migrate_log(log_path)
+            else:
+                self.store.migrate_json(json_path, unpack=lambda key, values: values.get("data", {}).items())
+            return
+
+        self.store = DictionaryLog(log_path)
+        self._migrate_json(json_path)
+        if not os.path.exists(log_path) and os.path.exists(log_path + ".migrated"):
+            # Powrót z SQLite - słowa są w bazie, log przeniósł _migrate_log
+            from core.sqlite_store import restore_json
+            restore_json("words", lambda items: self.store.import_entries(dict(items)))
+
+    def _migrate_log(self, log_path):
+        # Log zastępuje tabelę; po imporcie dostaje rozszerzenie .migrated (jak pliki JSON)
+        try:
+            self.store.replace_all(DictionaryLog(log_path).get_all().items())
+            os.replace(log_path, log_path + ".migrated")
+        except Exception as e:
+            print(f"Dictionary migration error: {e}")
+
+    def _migrate_json(self, json_path):
+        # Jednorazowo przenosimy stary dictionary.json ({"words": {"data": {...}}}) do logu
+        if not os.path.exists(json_path):
+            return
+        try:
+            old = JsonStore(json_path)
+            if old.exists("words"):
+                self.store.import_entries(old.get("words").get("data", {}))
+            os.replace(json_path, json_path + ".migrated")
+        except (OSError, ValueError) as e:
+            print(f"Dictionary migration error: {e}")
 
     def get_all(self):
-        return self.store.get("words")["data"]
+        if self.use_sqlite:
+            return dict(self.store.items())
+        return self.store.get_all()
+
+    def saved_words(self):
+        """Zbiór zapisanych słów - budowany raz, potem aktualizowany przez add/delete."""
+        if self._saved is None:
+            self._saved = {word.lower() for word in self.get_all()}
+        return self._saved
+
+    def _remember(self, words):
+        if self._saved is not None:
+            self._saved.update(word.lower() for word in words)
+
+    def get(self, word):
+        """Wpis {'translation', 'target', 'model'} dla słowa albo None (bez wczytywania całego słownika).
+
+        Wpisy zapisane przed dodaniem języka i modelu mają samo 'translation'.
+        """
+        if self.use_sqlite:
+            return self.store.get(word) if self.store.exists(word) else None
+        return self.store.get_all().get(word)
+
+    @staticmethod
+    def _entry(translation, target, model):
+        entry = {"translation": translation}
+        if target is not None:
+            entry["target"] = target
+        if model is not None:
+            entry["model"] = model
+        return entry
+
+    def add(self, word, translation, target=None, model=None):
+        """`target` i `model` - język i model, w których powstało tłumaczenie."""
+        if self.use_sqlite:
+            self.store.put(word, **self._entry(translation, target, model))
+        else:
+            self.store.put(word, translation, target=target, model=model)
+        self._remember([word])
 
-    def add(self, word, translation):
-        data = self.get_all()
-        data[word] = {"translation": translation}
-        self.store.put("words", data=data)
+    def add_many(self, entries, target=None, model=None):
+        """Zapisuje wiele słów {słowo: tłumaczenie} naraz (jedna transakcja / jeden zapis)."""
+        if not entries:
+            return
+        if self.use_sqlite:
+            for word, translation in entries.items():
+                self.store.store_put(word, self._entry(translation, target, model))
+            self.store.store_sync()
+        else:
+            self.store.put_many(entries, target=target, model=model)
+        self._remember(entries)
 
     def delete(self, word):
-        data = self.get_all()
-        if word in data:
-            del data[word]
-            self.store.put("words", data=data)
+        if self.use_sqlite:
+            if self.store.exists(word):
+                self.store.delete(word)
+        else:
+            self.store.delete(word)
+        if self._saved is not None:
+            self._saved.discard(word.lower())
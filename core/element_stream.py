@@ -0,0 +1,46 @@
+import threading
+from collections.abc import Sequence
+
+
+class ElementStream(Sequence):
+    """Lista elementów {'type', 'content'} dociągana z generatora na żądanie.
+
+    Paginacja woła ensure(i) w swoim wątku - kolejne elementy (np. rozdziały
+    EPUB) są parsowane dopiero wtedy, gdy strony do nich dojdą, więc
+    pierwsza strona nie czeka na całą książkę. len() i indeksowanie widzą
+    tylko elementy już wczytane. `progress` (0-100) ustawia źródło, jeśli zna
+    swoją długość; `complete` - generator się skończył.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._items = []
+        self._lock = threading.Lock()
+        self.complete = False
+        self.progress = 0.0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def ensure(self, index):
+        """Wczytuje elementy do `index` włącznie; False, gdy książka jest krótsza."""
+        if index < len(self._items):
+            return True
+        # Jeden generator na wiele wątków (np. nowa paginacja po zmianie układu)
+        with self._lock:
+            while index >= len(self._items) and not self.complete:
+                try:
+                    self._items.append(next(self._source))
+                except StopIteration:
+                    self.complete = True
+                    self.progress = 100.0
+        return index < len(self._items)
+
+    def load_all(self):
+        """Wczytuje resztę elementów i zwraca je jako listę."""
+        while self.ensure(len(self._items)):
+            pass
+        return list(self._items)
@@ -0,0 +1,174 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup
+
+from core.element_stream import ElementStream
+from core.fb2_loader import _local_name
+from core.fb2_metadata import empty_metadata, _clean
+
+# Nagłówki rozdziałów i akapity XHTML -> elementy dla PaginationEngine
+_HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+_EPUB_TARGET_TAGS = _HEADING_TAGS + ("p",)
+
+
+def _element_text(el):
+    # W XHTML białe znaki to formatowanie - sklejamy tekst i normalizujemy odstępy
+    return _clean("".join(el.itertext()))
+
+
+def _resolve(base_dir, href):
+    # href z OPF jest względny wobec katalogu OPF i może być zakodowany (%20)
+    return posixpath.normpath(posixpath.join(base_dir, unquote(href.split("#")[0])))
+
+
+class EpubPackage:
+    """Spis treści EPUB z pliku OPF: rozdziały w kolejności spine i metadane.
+
+    Czyta tylko META-INF/container.xml i OPF - rozdziały zostają w archiwum,
+    dopóki ktoś ich nie otworzy (open_chapter).
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        container = ET.fromstring(archive.read("META-INF/container.xml"))
+        rootfile = next(
+            (el for el in container.iter() if _local_name(el.tag) == "rootfile"), None
+        )
+        if rootfile is None or not rootfile.get("full-path"):
+            raise ValueError("EPUB without OPF rootfile")
+        self.opf_path = rootfile.get("full-path")
+        self._opf = ET.fromstring(archive.read(self.opf_path))
+        base_dir = posixpath.dirname(self.opf_path)
+
+        self.manifest = {}
+        for el in self._opf.iter():
+            if _local_name(el.tag) == "item" and el.get("id") and el.get("href"):
+                self.manifest[el.get("id")] = _resolve(base_dir, el.get("href"))
+
+        self.spine = []
+        for el in self._opf.iter():
+            if _local_name(el.tag) != "itemref" or el.get("linear") == "no":
+                continue
+            path = self.manifest.get(el.get("idref"))
+            if path:
+                self.spine.append(path)
+
+    def open_chapter(self, path):
+        return self.archive.open(path)
+
+    def metadata(self):
+        """Słownik jak empty_metadata() z bloku <metadata> OPF."""
+        metadata = empty_metadata()
+        cover_id = None
+        for el in self._opf.iter():
+            name = _local_name(el.tag)
+            text = _clean("".join(el.itertext()))
+            if name == "title" and metadata["title"] is None:
+                metadata["title"] = text or None
+            elif name == "creator" and text:
+                metadata["authors"].append(text)
+            elif name == "language" and metadata["language"] is None:
+                metadata["language"] = text or None
+            elif name == "subject" and text:
+                metadata["genres"].append(text)
+            elif name == "description" and metadata["annotation"] is None:
+                # Opis bywa w HTML (escapowanym) - zostawiamy sam tekst
+                metadata["annotation"] = BeautifulSoup(text, "html.parser").get_text(" ", strip=True) or None
+            elif name == "meta":
+                key, value = el.get("name"), el.get("content")
+                if key == "cover":
+                    cover_id = value
+                elif key == "calibre:series":
+                    metadata["series"] = value or None
+                elif key == "calibre:series_index":
+                    metadata["series_index"] = value or None
+
+        if cover_id:
+            metadata["cover"] = self.manifest.get(cover_id)
+        if metadata["authors"]:
+            metadata["author"] = ", ".join(metadata["authors"])
+        return metadata
+
+
+def iter_chapter_elements(source):
+    """Elementy {'type', 'content'} jednego rozdziału XHTML (strumieniowo).
+
+    Akapit wewnątrz nagłówka (i odwrotnie) to jeden element - liczy się
+    najbardziej zewnętrzny. Przy uszkodzonym XML rzuca ET.ParseError.
+    """
+    open_targets = 0
+    for event, el in ET.iterparse(source, events=("start", "end")):
+        name = _local_name(el.tag)
+        is_target = name in _EPUB_TARGET_TAGS
+
+        if event == "start":
+            if is_target:
+                open_targets += 1
+            continue
+
+        if is_target:
+            open_targets -= 1
+            if open_targets == 0:
+                content = _element_text(el)
+                if content:
+                    yield {'type': 'title' if name in _HEADING_TAGS else 'paragraph', 'content': content}
+        if open_targets == 0:
+            el.clear()
+
+
+def _soup_chapter_elements(raw):
+    # Rozdziały z encjami HTML (&nbsp;) albo niedomkniętymi tagami
+    soup = BeautifulSoup(raw, "html.parser")
+    for el in soup.find_all(_EPUB_TARGET_TAGS):
+        if el.find_parent(_EPUB_TARGET_TAGS) is not None:
+            continue
+        content = _clean(el.get_text())
+        if content:
+            yield {'type': 'title' if el.name in _HEADING_TAGS else 'paragraph', 'content': content}
+
+
+def iter_epub_elements(path, on_chapter=None):
+    """Generator elementów {'type', 'content'} z pliku EPUB.
+
+    Rozdziały są rozpakowywane i parsowane po jednym, w kolejności spine,
+    dopiero gdy generator do nich dojdzie - pierwsze elementy są gotowe bez
+    dotykania reszty książki. Uszkodzony rozdział parsuje BeautifulSoup.
+    `on_chapter(gotowe, wszystkie)` dostaje postęp po każdym rozdziale.
+    """
+    with zipfile.ZipFile(path) as archive:
+        package = EpubPackage(archive)
+        for number, chapter in enumerate(package.spine, 1):
+            try:
+                with package.open_chapter(chapter) as f:
+                    elements = list(iter_chapter_elements(f))
+            except KeyError:
+                print(f"EPUB chapter missing: {chapter}")
+                continue
+            except ET.ParseError as e:
+                print(f"EPUB chapter parse error {chapter}, fallback to BeautifulSoup: {e}")
+                elements = _soup_chapter_elements(archive.read(chapter))
+            if on_chapter is not None:
+                on_chapter(number, len(package.spine))
+            yield from elements
+
+
+def open_epub_stream(path):
+    """ElementStream książki EPUB - kolejne rozdziały parsuje dopiero paginacja.
+
+    Tu wczytujemy tylko pierwszy rozdział z treścią (i sprawdzamy, że książka
+    w ogóle ją ma).
+    """
+    stream = ElementStream(iter_epub_elements(
+        path, on_chapter=lambda done, total: setattr(stream, "progress", done / total * 100)))
+    if not stream.ensure(0):
+        raise ValueError("EPUB loaded but no content found")
+    return stream
+
+
+def read_epub_metadata(path):
+    """Metadane EPUB; czyta tylko container.xml i OPF."""
+    with zipfile.ZipFile(path) as archive:
+        return EpubPackage(archive).metadata()
@@ -0,0 +1,188 @@
+import os
+import struct
+import zipfile
+import zlib
+
+# Książki spakowane ZIP-em (typowe w bibliotekach FB2)
+ZIP_EXTENSIONS = (".fb2.zip", ".zip")
+
+# Nagłówek lokalny pliku w archiwum ZIP (bez sygnatury)
+_LOCAL_HEADER = struct.Struct("<HHHHHIIIHH")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+_FLAG_DATA_DESCRIPTOR = 0x08
+_STORED, _DEFLATED = 0, 8
+_ZIP64_EXTRA_ID = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+_RAW_READ_SIZE = 64 * 1024
+
+
+def is_zip_name(name):
+    return name.lower().endswith(ZIP_EXTENSIONS)
+
+
+def split_book_name(filename):
+    """'<id>.fb2.zip' -> ('<id>', '.fb2.zip'); dla pozostałych jak os.path.splitext."""
+    if filename.lower().endswith(".fb2.zip"):
+        return filename[:-8], filename[-8:]
+    return os.path.splitext(filename)
+
+
+def _zip_member(archive):
+    # Pierwszy plik .fb2 w archiwum - tak samo jak Fb2ZipStream przy imporcie
+    for info in archive.infolist():
+        if not info.is_dir() and info.filename.lower().endswith(".fb2"):
+            return info
+    raise ValueError("No FB2 file in ZIP archive")
+
+
+def _zip64_sizes(extra, compressed_size, uncompressed_size):
+    # Pole dodatkowe ZIP64: 8-bajtowe rozmiary tylko dla pól równych 0xFFFFFFFF
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, position)
+        data = extra[position + 4:position + 4 + length]
+        if header_id == _ZIP64_EXTRA_ID:
+            offset = 0
+            if uncompressed_size == _ZIP64_LIMIT and offset + 8 <= len(data):
+                offset += 8
+            if compressed_size == _ZIP64_LIMIT and offset + 8 <= len(data):
+                compressed_size = struct.unpack_from("<Q", data, offset)[0]
+            return compressed_size, True
+        position += 4 + length
+    return compressed_size, False
+
+
+def open_fb2(path):
+    """Otwiera książkę do czytania binarnego; z .fb2.zip rozpakowuje strumieniowo."""
+    if not is_zip_name(path):
+        return open(path, "rb")
+    with zipfile.ZipFile(path) as archive:
+        # Otwarty członek trzyma plik archiwum także po zamknięciu ZipFile
+        return archive.open(_zip_member(archive))
+
+
+class Fb2ZipStream:
+    """read(n) z rozpakowanym plikiem .fb2 z archiwum ZIP czytanego po kolei.
+
+    Źródło (np. ContentUriStream) nie musi wspierać seek, więc nie używamy
+    katalogu centralnego z końca archiwum, tylko nagłówków lokalnych: pliki
+    przed pierwszym .fb2 pomijamy, a jego dane rozpakowujemy zlib w locie.
+    Archiwum bez pliku .fb2 odrzucamy (ValueError), tak samo jak open_fb2.
+    Surowe bajty archiwum trafiają do `sink` (jeśli podany) - import może
+    zapisać archiwum na dysk w tym samym przebiegu; drain() dopisuje resztę
+    archiwum po rozpakowanym pliku.
+    """
+
+    def __init__(self, stream, sink=None):
+        self._stream = stream
+        self._sink = sink
+        self._buffer = b""
+        self._pending = b""        # surowe bajty przeczytane, a jeszcze nieużyte
+        self._remaining = None     # bajty do końca danych członka STORED
+        self._inflater = None
+        self._eof = False
+        self._open_member()
+
+    def _raw_read(self, size):
+        if self._pending:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+        data = self._stream.read(size)
+        if data and self._sink is not None:
+            self._sink.write(data)
+        return data
+
+    def _read_exact(self, size):
+        parts = []
+        while size > 0:
+            data = self._raw_read(size)
+            if not data:
+                raise ValueError("Truncated ZIP archive")
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def _open_member(self):
+        while True:
+            if self._read_exact(4) != _LOCAL_SIGNATURE:
+                # Katalog centralny albo śmieci - w archiwum nie ma już plików
+                raise ValueError("No FB2 file in ZIP archive")
+            (_, flags, method, _, _, _, compressed_size, uncompressed_size,
+             name_length, extra_length) = _LOCAL_HEADER.unpack(self._read_exact(_LOCAL_HEADER.size))
+            name = self._read_exact(name_length).decode("utf-8", errors="replace")
+            extra = self._read_exact(extra_length)
+            compressed_size, zip64 = _zip64_sizes(extra, compressed_size, uncompressed_size)
+
+            if method not in (_STORED, _DEFLATED):
+                raise ValueError(f"Unsupported ZIP compression method: {method}")
+            if method == _STORED and flags & _FLAG_DATA_DESCRIPTOR:
+                raise ValueError("Unsupported ZIP entry: stored with data descriptor")
+
+            if method == _DEFLATED:
+                self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+            else:
+                self._remaining = compressed_size
+            if name.lower().endswith(".fb2"):
+                return
+            self._skip_member(flags, zip64)
+
+    def _skip_member(self, flags, zip64=False):
+        # Dane bez rozmiaru w nagłówku (deskryptor) trzeba rozpakować, żeby znaleźć koniec
+        while self._read_member(_RAW_READ_SIZE):
+            pass
+        if flags & _FLAG_DATA_DESCRIPTOR:
+            # crc(4) rozmiary(4+4, w ZIP64 8+8), opcjonalnie poprzedzone sygnaturą
+            size = 20 if zip64 else 12
+            descriptor = self._read_exact(size)
+            if descriptor[:4] == b"PK\x07\x08":
+                self._read_exact(4)
+        self._inflater = None
+        self._remaining = None
+
+    def _read_member(self, size):
+        """Kolejna porcja rozpakowanych danych bieżącego członka; b'' na końcu."""
+        if self._inflater is None:
+            if not self._remaining:
+                return b""
+            data = self._read_exact(min(size, self._remaining))
+            self._remaining -= len(data)
+            return data
+
+        while not self._inflater.eof:
+            raw = self._raw_read(_RAW_READ_SIZE)
+            if not raw:
+                raise ValueError("Truncated ZIP archive")
+            data = self._inflater.decompress(raw)
+            if self._inflater.eof:
+                # Bajty za końcem strumienia deflate należą do dalszej części archiwum
+                self._pending = self._inflater.unused_data + self._pending
+            if data:
+                return data
+        return b""
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            data = self._read_member(_RAW_READ_SIZE)
+            if not data:
+                self._eof = True
+                break
+            self._buffer += data
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def drain(self):
+        """Czyta resztę archiwum (kopiowaną do `sink`)."""
+        while self._raw_read(_RAW_READ_SIZE):
+            pass
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
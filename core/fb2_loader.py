@@ -1,8 +1,14 @@
 from bs4 import BeautifulSoup
 import re
+import xml.etree.ElementTree as ET
+
+from core.fb2_archive import open_fb2
+
+# Tagi, z których budujemy elementy dla PaginationEngine
+_FB2_TARGET_TAGS = ("title", "p")
 
 def load_fb2_simple(path):
-    with open(path, "rb") as f:
+    with open_fb2(path) as f:
         raw = f.read()
 
     for enc in ("utf-8", "utf-16", "windows-1250", "latin-1"):
@@ -38,3 +44,79 @@ def load_fb2_simple(path):
         raise ValueError("FB2 loaded but no content found")
 
     return structured_data
+
+
+def _local_name(tag):
+    # '{http://www.gribuser.ru/xml/fictionbook/2.0}p' -> 'p'
+    return tag.rpartition("}")[2].lower() if isinstance(tag, str) else ""
+
+
+def _stripped_text(el):
+    # Odpowiednik BeautifulSoup.get_text(strip=True): każdy fragment tekstu
+    # przycinamy osobno i sklejamy bez separatora
+    return "".join(part.strip() for part in el.itertext())
+
+
+def iter_fb2_elements(source):
+    """Strumieniowo zwraca elementy {'type', 'content'} z pliku FB2.
+
+    Nie buduje całego drzewa XML: elementy spoza <title>/<p> (np. base64
+    w <binary>) są czyszczone zaraz po sparsowaniu. Kolejność i typy są
+    takie same jak w load_fb2_simple. Przy uszkodzonym XML rzuca
+    xml.etree.ElementTree.ParseError.
+    """
+    stack = []       # otwarte elementy (potrzebne do odpinania od rodzica)
+    pending = []     # [element, wynik] w kolejności otwarcia (jak find_all)
+    open_targets = 0
+
+    for event, el in ET.iterparse(source, events=("start", "end")):
+        name = _local_name(el.tag)
+
+        if event == "start":
+            if name in _FB2_TARGET_TAGS:
+                parent = _local_name(stack[-1].tag) if stack else ""
+                is_title = name == "title" or parent == "title"
+                pending.append([el, "title" if is_title else "paragraph", None])
+                open_targets += 1
+            stack.append(el)
+            continue
+
+        stack.pop()
+
+        if name in _FB2_TARGET_TAGS:
+            open_targets -= 1
+            for item in pending:
+                if item[0] is el:
+                    item[2] = _stripped_text(el)
+                    break
+
+            # Oddajemy gotowe elementy w kolejności dokumentu
+            while pending and pending[0][2] is not None:
+                _, el_type, content = pending.pop(0)
+                if content:
+                    yield {'type': el_type, 'content': content}
+
+        # Poza <title>/<p> nic już nie potrzebuje tego poddrzewa
+        if open_targets == 0:
+            el.clear()
+            if stack:
+                stack[-1].remove(el)
+
+
+def load_fb2_stream(path):
+    """Wersja load_fb2_simple oparta na iter_fb2_elements.
+
+    Uszkodzone pliki (częste w FB2, np. encje HTML) wracają do parsera
+    BeautifulSoup.
+    """
+    try:
+        with open_fb2(path) as f:
+            structured_data = list(iter_fb2_elements(f))
+    except ET.ParseError as e:
+        print(f"FB2 stream parse error, fallback to BeautifulSoup: {e}")
+        return load_fb2_simple(path)
+
+    if not structured_data:
+        raise ValueError("FB2 loaded but no content found")
+
+    return structured_data
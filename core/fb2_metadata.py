@@ -0,0 +1,215 @@
+import html
+import re
+import xml.etree.ElementTree as ET
+
+from core.fb2_archive import open_fb2
+from core.fb2_loader import _local_name
+
+# Metadane szukamy najwyżej w tylu pierwszych bajtach (do </description>)
+HEADER_LIMIT = 512 * 1024
+# Porcja odczytu przy czytaniu metadanych z pliku
+READ_SIZE = 16 * 1024
+
+
+def empty_metadata():
+    return {
+        "title": None,
+        "authors": [],
+        "author": "Unknown Author",
+        "language": None,
+        "series": None,
+        "series_index": None,
+        "genres": [],
+        "annotation": None,
+        "cover": None,
+    }
+
+
+def _author_name(parts):
+    # parts: {'first-name': ..., 'middle-name': ..., 'last-name': ..., 'nickname': ...}
+    names = [parts.get(tag) for tag in ("first-name", "middle-name", "last-name")]
+    names = [name for name in names if name]
+    if names:
+        return " ".join(names)
+    return parts.get("nickname") or None
+
+
+def _clean(text):
+    return " ".join(text.split())
+
+
+class Fb2MetadataParser:
+    """Przyrostowy parser bloku <description> pliku FB2.
+
+    feed() dostaje kolejne porcje bajtów (np. te same, które import hashuje
+    i zapisuje) i przestaje pracować po </description> albo po `limit`
+    bajtach - koszt nie zależy od długości książki. XMLPullParser sam
+    rozpoznaje kodowanie z deklaracji XML. Gdy nagłówek nie jest poprawnym
+    XML (częste w FB2, np. encje HTML), metadane wyciągamy wyrażeniami
+    regularnymi z zebranego początku pliku.
+    """
+
+    def __init__(self, limit=HEADER_LIMIT):
+        self.limit = limit
+        self.done = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._failed = False
+        self._head = bytearray()
+        self._stack = []
+        self._author = None
+        self._metadata = empty_metadata()
+
+    def feed(self, chunk):
+        if self.done:
+            return
+        self._head += chunk
+
+        if not self._failed:
+            try:
+                self._parser.feed(chunk)
+                self._read_events()
+            except ET.ParseError as e:
+                print(f"FB2 header parse error, fallback to regex: {e}")
+                self._failed = True
+
+        if self._failed and re.search(rb"</description\s*>", self._head, re.IGNORECASE):
+            self.done = True
+        if len(self._head) >= self.limit:
+            self.done = True
+
+    def _read_events(self):
+        for event, el in self._parser.read_events():
+            name = _local_name(el.tag)
+            if event == "start":
+                self._start(name, el)
+                self._stack.append(name)
+                continue
+
+            self._stack.pop()
+            self._end(name, el)
+            if name == "description":
+                self.done = True
+                return
+
+    def _in_title_info(self):
+        return "title-info" in self._stack
+
+    def _start(self, name, el):
+        metadata = self._metadata
+        if not self._in_title_info():
+            return
+        if name == "author" and self._stack[-1] == "title-info":
+            self._author = {}
+        elif name == "sequence" and metadata["series"] is None:
+            metadata["series"] = el.get("name") or None
+            metadata["series_index"] = el.get("number") or None
+        elif name == "image" and "coverpage" in self._stack and metadata["cover"] is None:
+            # l:href / xlink:href="#cover.jpg" - odnośnik do <binary id="cover.jpg">
+            for key, value in el.attrib.items():
+                if key.endswith("href"):
+                    metadata["cover"] = value.lstrip("#")
+                    break
+
+    def _end(self, name, el):
+        metadata = self._metadata
+        if self._in_title_info():
+            text = _clean("".join(el.itertext()))
+            parent = self._stack[-1]
+            if self._author is not None and parent == "author":
+                self._author[name] = text
+            elif name == "author" and parent == "title-info":
+                author = _author_name(self._author)
+                if author:
+                    metadata["authors"].append(author)
+                self._author = None
+            elif name == "book-title" and parent == "title-info":
+                metadata["title"] = text or None
+            elif name == "lang" and parent == "title-info":
+                metadata["language"] = text or None
+            elif name == "genre" and text:
+                metadata["genres"].append(text)
+            elif name == "annotation":
+                paragraphs = [_clean("".join(p.itertext())) for p in el.iter() if _local_name(p.tag) == "p"]
+                metadata["annotation"] = "\n".join(p for p in paragraphs if p) or text or None
+
+        if name in ("title-info", "document-info", "publish-info", "custom-info"):
+            # Sekcje, z których już nic nie potrzebujemy
+            el.clear()
+
+    def result(self):
+        """Słownik metadanych (pola jak w empty_metadata)."""
+        metadata = self._regex_metadata() if self._failed else self._metadata
+        if metadata["authors"]:
+            metadata["author"] = ", ".join(metadata["authors"])
+        return metadata
+
+    def _regex_metadata(self):
+        metadata = empty_metadata()
+        text = _decode(bytes(self._head))
+        title_info = re.search(r'<title-info>(.*?)</title-info>', text, re.DOTALL | re.IGNORECASE)
+        if not title_info:
+            return metadata
+        section = title_info.group(1)
+
+        metadata["title"] = _tag_text("book-title", section) or None
+        metadata["language"] = _tag_text("lang", section) or None
+        metadata["genres"] = [_strip_tags(g) for g in re.findall(r'<genre[^>]*>(.*?)</genre>', section, re.DOTALL | re.IGNORECASE)]
+        annotation = re.search(r'<annotation[^>]*>(.*?)</annotation>', section, re.DOTALL | re.IGNORECASE)
+        if annotation:
+            paragraphs = re.split(r'</p\s*>', annotation.group(1), flags=re.IGNORECASE)
+            metadata["annotation"] = "\n".join(p for p in map(_strip_tags, paragraphs) if p) or None
+
+        for author in re.findall(r'<author>(.*?)</author>', section, re.DOTALL | re.IGNORECASE):
+            name = _author_name({
+                tag: _tag_text(tag, author)
+                for tag in ("first-name", "middle-name", "last-name", "nickname")
+            })
+            if name:
+                metadata["authors"].append(name)
+
+        sequence = re.search(r'<sequence([^>]*)>', section, re.IGNORECASE)
+        if sequence:
+            attrs = dict(re.findall(r'([\w:-]+)\s*=\s*"([^"]*)"', sequence.group(1)))
+            metadata["series"] = html.unescape(attrs.get("name", "")) or None
+            metadata["series_index"] = attrs.get("number") or None
+
+        cover = re.search(r'<coverpage>.*?href\s*=\s*"#?([^"]+)"', section, re.DOTALL | re.IGNORECASE)
+        if cover:
+            metadata["cover"] = cover.group(1)
+        return metadata
+
+
+def _decode(raw):
+    # Najpierw kodowanie z deklaracji XML (np. windows-1251), potem zgadujemy
+    declared = re.match(rb'<\?xml[^>]*encoding=["\']([\w.-]+)', raw.lstrip(b"\xef\xbb\xbf"))
+    encodings = ("utf-8", "utf-16", "windows-1250", "latin-1")
+    if declared:
+        encodings = (declared.group(1).decode("ascii"),) + encodings
+    for enc in encodings:
+        try:
+            return raw.decode(enc)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return raw.decode("utf-8", errors="ignore")
+
+
+def _strip_tags(text):
+    return _clean(html.unescape(re.sub(r'<[^>]+>', '', text)))
+
+
+def _tag_text(tag_name, text):
+    # Tekst pierwszego tagu bez zagnieżdżonych znaczników i encji
+    m = re.search(f'<{tag_name}[^>]*>(.*?)</{tag_name}>', text, re.DOTALL | re.IGNORECASE)
+    return _strip_tags(m.group(1)) if m else ""
+
+
+def read_fb2_metadata(path, limit=HEADER_LIMIT):
+    """Metadane z pliku FB2 (także .fb2.zip); czyta tylko początek pliku do </description>."""
+    parser = Fb2MetadataParser(limit)
+    with open_fb2(path) as f:
+        while not parser.done:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    return parser.result()
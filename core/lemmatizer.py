@@ -0,0 +1,248 @@
+import os
+import re
+
+from core.offline_dictionary import OfflineDictionary
+
+# Języki, dla których szukamy tablic <język>.ldx albo <język>.tsv (forma -> lemat)
+LEMMA_LANGUAGES = ("en", "pl", "cs", "uk")
+
+_CYRILLIC_RE = re.compile(r"[Ѐ-ӿ]")
+_POLISH_RE = re.compile(r"[ąćęłńśźż]")
+_CZECH_RE = re.compile(r"[áčďéěíňřšťúůýž]")
+
+# Najczęstsze formy nieregularne angielskiego - działają bez tablic .ldx.
+# Zapis: lemat: formy. Pomijamy formy, które same są częstymi słowami
+# (rose, left, saw, lay, felt, found, fell, drunk, thought, spoke, stole,
+# broke, rung) - "rose" w tekście to częściej róża niż "rise". Lemat bez
+# form ("") nadal pomaga końcówkom regularnych ("finds" -> "find").
+_EN_IRREGULAR = {
+    "be": "am is are was were been being",
+    "have": "has had having",
+    "do": "does did done doing",
+    "go": "goes went gone",
+    "say": "says said",
+    "make": "made making",
+    "take": "took taken taking",
+    "come": "came coming",
+    "see": "seen",
+    "know": "knew known",
+    "get": "got gotten getting",
+    "give": "gave given giving",
+    "find": "",
+    "think": "",
+    "tell": "told",
+    "become": "became becoming",
+    "leave": "leaving",
+    "feel": "",
+    "bring": "brought",
+    "begin": "began begun beginning",
+    "keep": "kept",
+    "hold": "held",
+    "write": "wrote written writing",
+    "stand": "stood",
+    "hear": "heard",
+    "mean": "meant",
+    "meet": "met",
+    "run": "ran running",
+    "speak": "spoken",
+    "sit": "sat sitting",
+    "lose": "lost losing",
+    "pay": "paid",
+    "lie": "lain lying",
+    "understand": "understood",
+    "grow": "grew grown",
+    "fall": "fallen",
+    "sell": "sold",
+    "send": "sent",
+    "build": "built",
+    "buy": "bought",
+    "catch": "caught",
+    "teach": "taught",
+    "fight": "fought",
+    "seek": "sought",
+    "choose": "chose chosen choosing",
+    "rise": "risen rising",
+    "drive": "drove driven driving",
+    "ride": "rode ridden riding",
+    "break": "broken",
+    "steal": "stolen",
+    "wake": "woke woken waking",
+    "wear": "wore worn",
+    "swim": "swam swum swimming",
+    "sing": "sang sung",
+    "drink": "drank",
+    "ring": "rang",
+    "eat": "ate eaten",
+    "forget": "forgot forgotten forgetting",
+    "fly": "flew flown flies",
+    "draw": "drew drawn",
+    "throw": "threw thrown",
+    "hide": "hid hidden hiding",
+    "shake": "shook shaken shaking",
+    "sleep": "slept",
+    "spend": "spent",
+    "win": "won winning",
+    "man": "men",
+    "woman": "women",
+    "child": "children",
+    "foot": "feet",
+    "tooth": "teeth",
+    "mouse": "mice",
+}
+
+
+def _build_irregular(table):
+    forms = {}
+    for lemma, words in table.items():
+        for form in words.split():
+            forms.setdefault(form, lemma)
+    return forms
+
+
+# Formy, których lemat sam jest niejednoznaczny ("led" - prowadzić, a "lead"
+# to też ołów; "tore" - drzeć, a "tear" to też łza). Jak regularne końcówki:
+# tylko gdy known(lemat) to potwierdza.
+_EN_IRREGULAR_AMBIGUOUS = {
+    "lead": "led",
+    "tear": "tore torn",
+}
+
+EN_IRREGULAR_FORMS = _build_irregular(_EN_IRREGULAR)
+EN_AMBIGUOUS_FORMS = _build_irregular(_EN_IRREGULAR_AMBIGUOUS)
+
+
+def lemma_entries(pairs):
+    # Listy lematyzacyjne mają linie lemat<TAB>forma; zapisujemy forma -> lemat
+    # oraz lemat -> lemat, żeby Lemmatizer rozpoznawał same lematy
+    lemmas = []
+    for lemma, form in pairs:
+        lemmas.append(lemma)
+        yield form, lemma
+    for lemma in lemmas:
+        yield lemma, lemma
+
+
+class LemmaList:
+    """Mała tablica forma -> lemat z listy TSV (lemat<TAB>forma) w pamięci.
+
+    Dla list dołączonych do aplikacji (data/lemmas/<język>.tsv) - duże
+    listy lepiej zbudować do .ldx (dev/build_offline_dictionary.py --lemmas).
+    """
+
+    def __init__(self, path):
+        self._forms = {}
+        for form, lemma in lemma_entries(OfflineDictionary.read_tsv(path)):
+            self._forms.setdefault(form.lower(), lemma.lower())
+
+    def lookup(self, word):
+        return self._forms.get(word.strip().lower())
+
+    def close(self):
+        pass
+
+
+def _english_candidates(word):
+    """Możliwe lematy dla regularnych końcówek angielskich (od najbardziej prawdopodobnych)."""
+    candidates = []
+    if len(word) > 4 and word.endswith("ies"):
+        candidates.append(word[:-3] + "y")
+    if len(word) > 3 and word.endswith("es"):
+        candidates.append(word[:-2])
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        candidates.append(word[:-1])
+    if len(word) > 4 and word.endswith("ied"):
+        candidates.append(word[:-3] + "y")
+    if len(word) > 3 and word.endswith("ed"):
+        stem = word[:-2]
+        candidates += [stem, word[:-1]]
+        if len(stem) > 2 and stem[-1] == stem[-2]:
+            candidates.append(stem[:-1])
+    if len(word) > 4 and word.endswith("ing"):
+        stem = word[:-3]
+        candidates += [stem, stem + "e"]
+        if len(stem) > 2 and stem[-1] == stem[-2]:
+            candidates.append(stem[:-1])
+    return candidates
+
+
+class Lemmatizer:
+    """Sprowadza formy odmienione do lematu ("spoken", "speaks" -> "speak").
+
+    Najpierw tablice forma -> lemat (OfflineDictionary z <język>.ldx albo
+    LemmaList z <język>.tsv w `search_dirs`), potem wbudowane formy
+    nieregularne angielskiego. Regularne końcówki angielskie (-s, -ed, -ing)
+    i niejednoznaczne formy nieregularne zdejmujemy tylko wtedy, gdy kandydat
+    jest w tablicy albo `known(kandydat)` zwraca True (np. słowo już jest
+    w słowniku) - lepiej zostawić formę, niż tłumaczyć nieistniejące słowo.
+    Język zgadujemy po alfabecie słowa; słowa bez znaków diakrytycznych
+    ("jest", "ma") rozstrzyga język książki (set_language).
+    """
+
+    def __init__(self, search_dirs):
+        self.tables = {}
+        self.language = None
+        for language in LEMMA_LANGUAGES:
+            self.tables.update(self._open_table(language, search_dirs))
+
+    @staticmethod
+    def _open_table(language, search_dirs):
+        # .ldx (zbudowana, np. przez użytkownika) ma pierwszeństwo przed listą .tsv
+        for extension, table_class in ((".ldx", OfflineDictionary), (".tsv", LemmaList)):
+            for directory in search_dirs:
+                path = os.path.join(directory, language + extension)
+                if not os.path.exists(path):
+                    continue
+                try:
+                    return {language: table_class(path)}
+                except (ValueError, OSError) as e:
+                    print(f"Lemma table error {path}: {e}")
+        return {}
+
+    def set_language(self, language):
+        """Język bieżącej książki ("pl", "en-US", None) z jej metadanych."""
+        language = (language or "").split("-")[0].strip().lower()
+        self.language = language if language in LEMMA_LANGUAGES else None
+
+    def languages_for(self, word):
+        if _CYRILLIC_RE.search(word):
+            return ("uk",)
+        if _POLISH_RE.search(word):
+            return ("pl",)
+        if _CZECH_RE.search(word):
+            return ("cs",)
+        if self.language in ("en", "pl", "cs"):
+            # "jest" w angielskiej książce to żart, nie "być"
+            return (self.language,)
+        return ("en", "pl", "cs")
+
+    def _from_tables(self, word, languages):
+        for language in languages:
+            table = self.tables.get(language)
+            if table is not None:
+                lemma = table.lookup(word)
+                if lemma:
+                    return lemma
+        return None
+
+    def lemma(self, word, known=None):
+        """Lemat słowa (małymi literami); bez dopasowania - samo słowo."""
+        word = word.strip().lower()
+        languages = self.languages_for(word)
+
+        lemma = self._from_tables(word, languages)
+        if lemma is not None:
+            return lemma
+        if "en" not in languages:
+            return word
+        if word in EN_IRREGULAR_FORMS:
+            return EN_IRREGULAR_FORMS[word]
+        ambiguous = EN_AMBIGUOUS_FORMS.get(word)
+        if ambiguous is not None and known is not None and known(ambiguous):
+            return ambiguous
+
+        for candidate in _english_candidates(word):
+            if candidate in _EN_IRREGULAR or self._from_tables(candidate, ("en",)) == candidate:
+                return candidate
+            if known is not None and known(candidate):
+                return candidate
+        return word
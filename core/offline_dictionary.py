@@ -0,0 +1,129 @@
+import glob
+import mmap
+import os
+import struct
+
+# Format pliku <źródło>-<cel>.ldx (little-endian):
+#   nagłówek: magic(4s) wersja(H) zarezerwowane(H) liczba_haseł(I)
+#   offsety:  początek rekordu (I) * liczba_haseł, w kolejności posortowanych haseł
+#   rekordy:  hasło UTF-8, \0, tłumaczenie UTF-8, \0
+# Hasła są małymi literami i posortowane po bajtach UTF-8 (= po punktach kodowych).
+DICT_MAGIC = b"LBDX"
+DICT_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+
+
+class OfflineDictionary:
+    """Słownik dwujęzyczny czytany z pliku zmapowanego w pamięci.
+
+    Wyszukiwanie to bisekcja po posortowanych hasłach - O(log n) odczytów
+    z mmap, bez wczytywania słownika do pamięci.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != DICT_MAGIC or version != DICT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported dictionary file: {path}")
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def _record_offset(self, index):
+        return struct.unpack_from("<I", self._mm, _HEADER.size + 4 * index)[0]
+
+    def _key_at(self, index):
+        start = self._record_offset(index)
+        return self._mm[start:self._mm.find(b"\0", start)]
+
+    def lookup(self, word):
+        """Tłumaczenie hasła albo None."""
+        key = word.strip().lower().encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo >= self._count:
+            return None
+        start = self._record_offset(lo)
+        key_end = self._mm.find(b"\0", start)
+        if self._mm[start:key_end] != key:
+            return None
+        value_end = self._mm.find(b"\0", key_end + 1)
+        return self._mm[key_end + 1:value_end].decode("utf-8")
+
+    def close(self):
+        self._mm.close()
+
+    @staticmethod
+    def build(entries, path):
+        """Zapisuje słownik z par (hasło, tłumaczenie); przy powtórzeniach wygrywa pierwsze."""
+        merged = {}
+        for word, translation in entries:
+            key = word.strip().lower().encode("utf-8")
+            if key and b"\0" not in key and key not in merged:
+                merged[key] = translation.strip().replace("\0", "").encode("utf-8")
+
+        keys = sorted(merged)
+        offsets = []
+        position = _HEADER.size + 4 * len(keys)
+        for key in keys:
+            offsets.append(position)
+            position += len(key) + len(merged[key]) + 2
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(DICT_MAGIC, DICT_VERSION, 0, len(keys)))
+            f.write(struct.pack(f"<{len(keys)}I", *offsets))
+            for key in keys:
+                f.write(key + b"\0" + merged[key] + b"\0")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_tsv(path):
+        """Pary (hasło, tłumaczenie) z pliku TSV: hasło<TAB>tłumaczenie w linii."""
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                parts = line.rstrip("\r\n").split("\t", 1)
+                if len(parts) == 2 and parts[0] and parts[1]:
+                    yield parts[0], parts[1]
+
+
+class OfflineTranslator:
+    """Backend tłumaczeń dla TranslatorRegistry: słowniki .ldx dla języka docelowego.
+
+    Szuka plików *-<cel>.ldx w podanych katalogach i pyta je po kolei.
+    """
+
+    def __init__(self, target, search_dirs):
+        self.target = target
+        self.dictionaries = []
+        for directory in search_dirs:
+            for path in sorted(glob.glob(os.path.join(directory, f"*-{target}.ldx"))):
+                try:
+                    self.dictionaries.append(OfflineDictionary(path))
+                except (ValueError, struct.error, OSError) as e:
+                    print(f"Offline dictionary error {path}: {e}")
+
+    def close(self):
+        for dictionary in self.dictionaries:
+            dictionary.close()
+        self.dictionaries = []
+
+    def translate(self, word):
+        if not self.dictionaries:
+            raise LookupError(f"No offline dictionary for '{self.target}'")
+        for dictionary in self.dictionaries:
+            translation = dictionary.lookup(word)
+            if translation is not None:
+                return translation
+        return None
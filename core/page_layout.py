@@ -0,0 +1,318 @@
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+# Te same separatory co TextInput._tokenize w Kivy - dzięki temu łamiemy
+# linie dokładnie w tych miejscach co ReaderTextInput
+_TOKEN_RE = re.compile(r"[^ ,'\".;:\r\t]+|[ ,'\".;:\r\t]")
+_WORD_RE = re.compile(r"\S+\s*")
+
+_DELIMITERS = frozenset(" ,'\".;:\r\t")
+
+PARAGRAPH_INDENT = "    "
+
+
+def _token_start(text, pos):
+    # Początek tokenu (w sensie TextInput._tokenize) zawierającego znak `pos`
+    if text[pos] in _DELIMITERS:
+        return pos
+    while pos > 0 and text[pos - 1] not in _DELIMITERS:
+        pos -= 1
+    return pos
+
+
+def _token_end(text, pos):
+    # Koniec tokenu zaczynającego się na `pos`
+    if text[pos] in _DELIMITERS:
+        return pos + 1
+    end = len(text)
+    while pos < end and text[pos] not in _DELIMITERS:
+        pos += 1
+    return pos
+
+
+def format_piece(element, start, end):
+    """Tekst fragmentu content[start:end] elementu, tak jak trafia na stronę.
+
+    Wcięcie akapitu i odstępy tytułu dodajemy tylko na początku i końcu
+    elementu; fragment ucięty w środku nie ma końcowych spacji.
+    """
+    content = element.get('content', '')
+    is_end = end >= len(content)
+    piece = content[start:end] if is_end else content[start:end].rstrip()
+
+    if element.get('type') == 'title':
+        prefix = "\n" if start == 0 else ""
+        return prefix + piece.upper() + ("\n\n" if is_end else "")
+
+    prefix = PARAGRAPH_INDENT if start == 0 else ""
+    return prefix + piece + ("\n" if is_end else "")
+
+
+class LineState:
+    """Stan łamania linii: liczba zamkniętych linii oraz szerokość i tekst bieżącej."""
+
+    __slots__ = ("pushed", "x", "line")
+
+    def __init__(self, pushed=0, x=0.0, line=""):
+        self.pushed = pushed
+        self.x = x
+        self.line = line
+
+    def copy(self):
+        return LineState(self.pushed, self.x, self.line)
+
+    @property
+    def lines(self):
+        # TextInput zawsze ma przynajmniej jedną (ostatnią) linię
+        return self.pushed + 1
+
+
+class _WidthCache(dict):
+    # Słownik tekst -> szerokość; brakujące wpisy mierzy przy pierwszym użyciu,
+    # trafienia idą ścieżką C (map(cache.__getitem__, ...))
+    def __init__(self, measure):
+        super().__init__()
+        self._measure = measure
+
+    def __missing__(self, ch):
+        w = self[ch] = self._measure(ch)
+        return w
+
+
+class PageLayoutModel:
+    """Model strony czytnika: zachłanne łamanie linii jak TextInput._split_smart.
+
+    Nie dotyka widgetów ani okna, więc działa też poza wątkiem Kivy.
+    `char_width` to funkcja znak -> szerokość (np. GlyphWidthTable.width).
+    Suma szerokości znaków nie uwzględnia kerningu i wychodzi odrobinę za
+    duża, więc gdy linia miałaby się złamać o mniej niż `exact_slack`
+    (ułamek szerokości tekstu), a podano `exact_width` (tekst -> szerokość),
+    decyzję sprawdzamy dokładnym pomiarem tokenów linii.
+    """
+
+    def __init__(self, char_width, width, height, line_height, padding=(0, 0, 0, 0), line_spacing=0,
+                 exact_width=None, exact_slack=0.02):
+        self.char_width = char_width
+        self.exact_width = exact_width
+        self.text_width = width - padding[0] - padding[2]
+        self.exact_slack = self.text_width * exact_slack
+        # Odpowiednik warunku TextInput.minimum_height <= height
+        usable = height - padding[1] - padding[3]
+        self.max_lines = max(1, int(usable // (line_height + line_spacing)))
+        self._char_widths = _WidthCache(char_width)
+        self._exact_widths = _WidthCache(exact_width) if exact_width is not None else None
+
+    def token_width(self, token):
+        return sum(map(self._char_widths.__getitem__, token))
+
+    def _exact_fits(self, text):
+        # TextInput mierzy każdy token osobno i sumuje szerokości
+        return sum(map(self._exact_widths.__getitem__, _TOKEN_RE.findall(text))) <= self.text_width
+
+    def feed(self, state, text):
+        """Dopisuje tekst do stanu linii (modyfikuje i zwraca `state`)."""
+        for i, segment in enumerate(text.split("\n")):
+            if i:
+                state.pushed += 1
+                state.x = 0.0
+                state.line = ""
+            if segment:
+                self._feed_segment(state, segment)
+        return state
+
+    def _feed_segment(self, state, segment):
+        # Linia łamie się na tokenie, w którym suma szerokości znaków przekracza
+        # szerokość tekstu - znak szukamy bisekcją po sumach prefiksowych,
+        # a granice tokenu wyznaczamy lokalnie wokół niego
+        width = self.text_width
+        cum = list(accumulate(map(self._char_widths.__getitem__, segment), initial=0.0))
+        count = len(segment)
+        prefix = state.line       # to, co już stoi na bieżącej linii przed segmentem
+        start = 0                 # początek bieżącej linii w segmencie
+        base = -state.x           # cum[start] minus szerokość prefiksu
+
+        while True:
+            k = bisect_right(cum, base + width, start + 1)
+            if k > count:
+                break
+
+            token = _token_start(segment, k - 1)
+            if token == start and not prefix:
+                # Token szerszy niż cała linia - TextInput tnie go po znakach
+                state.line = ""
+                state.x = 0.0
+                self._feed_tokens(state, _TOKEN_RE.findall(segment[start:]))
+                return
+
+            if self.exact_width is not None:
+                while True:
+                    end = _token_end(segment, token)
+                    if cum[end] - base - width > self.exact_slack:
+                        break
+                    if not self._exact_fits(prefix + segment[start:end]):
+                        break
+                    token = end
+                    if token >= count:
+                        break
+                if token >= count:
+                    break
+
+            state.pushed += 1
+            prefix = ""
+            start = token
+            base = cum[token]
+
+        state.x = cum[count] - base
+        state.line = prefix + segment[start:]
+
+    def _feed_tokens(self, state, tokens):
+        # Wolna ścieżka token po tokenie, jak w TextInput._split_smart
+        width = self.text_width
+
+        for token in tokens:
+            w = self.token_width(token)
+            overshoot = state.x + w - width
+            if state.line and overshoot > 0 and not (
+                    self.exact_width is not None and overshoot <= self.exact_slack
+                    and self._exact_fits(state.line + token)):
+                state.pushed += 1
+                state.x = 0.0
+                state.line = ""
+
+            if width >= 1 and w > width:
+                w, token = self._split_long_token(state, token, w)
+                state.x = w
+            else:
+                state.x += w
+            state.line += token
+
+    def _split_long_token(self, state, token, w):
+        width = self.text_width
+        while w > width:
+            split_width = 0.0
+            split_pos = 0
+            for ch in token:
+                cw = self._char_widths[ch]
+                if split_width + cw > width:
+                    break
+                split_width += cw
+                split_pos += 1
+            if split_pos == 0:
+                break
+            state.pushed += 1
+            token = token[split_pos:]
+            w -= split_width
+        return w, token
+
+    def fits(self, state):
+        return state.lines <= self.max_lines
+
+    @staticmethod
+    def extend(state, measured):
+        """Dokleja tekst zmierzony od pustej linii (`measured`) do stanu stojącego na początku linii."""
+        return LineState(state.pushed + measured.pushed, measured.x, measured.line)
+
+    def split_point(self, element, start):
+        """Najdalszy koniec słowa, do którego fragment elementu od `start` mieści się na pustej stronie.
+
+        Zwraca offset początku następnego słowa (co najmniej jedno słowo zawsze przechodzi).
+        """
+        content = element.get('content', '')
+        is_title = element.get('type') == 'title'
+
+        state = self.new_state()
+        if start == 0:
+            self.feed(state, "\n" if is_title else PARAGRAPH_INDENT)
+
+        best = None
+        for match in _WORD_RE.finditer(content, start):
+            word = match.group().rstrip()
+            trial = self.feed(state.copy(), word.upper() if is_title else word)
+            if not self.fits(trial) and best is not None:
+                break
+            best = match.end()
+            # Spacje po słowie dopisujemy dopiero przed kolejnym słowem
+            state = self.feed(trial, match.group()[len(word):])
+
+        return len(content) if best is None else best
+
+    @staticmethod
+    def new_state():
+        return LineState()
+
+
+def paginate(elements, model, start=(0, 0)):
+    """Generuje kolejne strony jako (tekst, kotwica_początku, kotwica_końca).
+
+    Kotwica to (indeks elementu, offset znaku w jego 'content'). Logika
+    podziału jest taka sama jak w PaginationEngine: element, który się nie
+    mieści, otwiera nową stronę, a akapit dłuższy niż ekran dzielimy po słowach.
+    """
+    index, offset = start
+    total = len(elements)
+    # Każdy pełny fragment kończy się znakiem nowej linii, więc układ elementu
+    # nie zależy od reszty strony - mierzymy go raz, nawet gdy przechodzi na kolejną
+    measured_key = measured = None
+    # ElementStream dociąga elementy dopiero, gdy paginacja do nich dojdzie
+    has = getattr(elements, "ensure", None) or (lambda i: i < total)
+
+    while has(index):
+        page_start = (index, offset)
+        pieces = []
+        state = model.new_state()
+
+        while has(index):
+            element = elements[index]
+            length = len(element.get('content', ''))
+            piece = format_piece(element, offset, length)
+
+            if measured_key != (index, offset):
+                measured_key = (index, offset)
+                measured = model.feed(model.new_state(), piece)
+
+            trial = model.extend(state, measured)
+            if model.fits(trial):
+                pieces.append(piece)
+                state = trial
+                index += 1
+                offset = 0
+                continue
+
+            if pieces:
+                break
+
+            end = model.split_point(element, offset)
+            pieces.append(format_piece(element, offset, end))
+            if end >= length:
+                index += 1
+                offset = 0
+            else:
+                offset = end
+            break
+
+        yield "".join(pieces), page_start, (index, offset)
+
+
+def slice_text(elements, start, end):
+    """Tekst między dwiema kotwicami, złożony tak samo jak strony z paginate."""
+    index, offset = start
+    pieces = []
+
+    while (index, offset) < tuple(end):
+        element = elements[index]
+        length = len(element.get('content', ''))
+        stop = end[1] if index == end[0] else length
+        pieces.append(format_piece(element, offset, stop))
+        if stop < length:
+            break
+        index, offset = index + 1, 0
+
+    return "".join(pieces)
+
+
+def cumulative_sizes(elements):
+    """Narastające rozmiary treści elementów (do szacowania pozycji w książce)."""
+    if hasattr(elements, "cumulative_sizes"):
+        return elements.cumulative_sizes()
+    return list(accumulate(len(el.get('content', '')) for el in elements))
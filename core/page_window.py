@@ -0,0 +1,216 @@
+import math
+from collections.abc import Sequence
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from core.page_layout import paginate, slice_text, cumulative_sizes
+
+
+class PageWindow:
+    """Leniwa lista stron: paginuje tylko kilka stron wokół bieżącej pozycji.
+
+    Zachowuje się jak lista stron dla ReaderScreen (len, indeksowanie), ale
+    zna tylko okno stron zakotwiczone kotwicą (indeks elementu, offset znaku).
+    Numery stron poza oknem i ich łączna liczba są szacowane z rozmiaru
+    treści. Gdy okno dojdzie do początku książki, numeracja jest przesuwana
+    tak, by pierwsza strona miała indeks 0 - zmianę dostaje `on_reindex`.
+    """
+
+    # Od jakiego rozmiaru treści (znaki/bajty) opłaca się tryb okna
+    MIN_BOOK_SIZE = 200_000
+    # Ile stron paginujemy naprzód/wstecz przy rozszerzaniu okna
+    RADIUS = 3
+    # Maksymalna liczba stron trzymanych w oknie
+    MAX_PAGES = 24
+
+    def __init__(self, elements, model, anchor=(0, 0), index=None, on_reindex=None):
+        self._elements = elements
+        self._model = model
+        self.on_reindex = on_reindex
+
+        self._sizes = cumulative_sizes(elements)
+        self._total_size = self._sizes[-1] if self._sizes else 0
+
+        self._reset(tuple(anchor), index)
+
+    @classmethod
+    def suits(cls, elements):
+        """Czy książka jest na tyle długa, że opłaca się tryb okna."""
+        sizes = cumulative_sizes(elements)
+        return bool(sizes) and sizes[-1] >= cls.MIN_BOOK_SIZE
+
+    # ===== POZYCJE =====
+    def _position(self, anchor):
+        index, offset = anchor
+        return (self._sizes[index - 1] if index else 0) + offset
+
+    def _avg_page_size(self):
+        covered = self._position(self._end) - self._position(self._starts[0])
+        return max(1.0, covered / max(1, len(self._texts)))
+
+    def _anchor_for_index(self, index):
+        # Szacunkowa kotwica dla numeru strony: początek elementu w tym miejscu treści
+        position = index * self._avg_page_size()
+        element = min(bisect_left(self._sizes, position), len(self._elements) - 1)
+        return (element, 0)
+
+    @property
+    def at_book_start(self):
+        return not self._starts or self._starts[0] == (0, 0)
+
+    @property
+    def at_book_end(self):
+        return self._end[0] >= len(self._elements)
+
+    @property
+    def estimated(self):
+        return not (self.at_book_start and self.at_book_end)
+
+    # ===== OKNO =====
+    def _reset(self, anchor, index):
+        self._starts = []
+        self._texts = []
+        self._end = anchor
+        self._first = 0
+        self._extend_forward(self.RADIUS + 1)
+
+        if not self._starts:
+            return
+        if index is None:
+            index = round(self._position(anchor) / self._avg_page_size())
+        self._first = index
+        self._normalize()
+
+    def _normalize(self):
+        # Na początku książki pierwsza strona musi mieć indeks 0, a gdy szacunek
+        # numerów wyszedł za niski (ujemny), przesuwamy numerację w górę
+        if (self.at_book_start or self._first < 0) and self._first != 0:
+            delta = -self._first
+            self._first = 0
+            if self.on_reindex:
+                self.on_reindex(delta)
+
+    def _extend_forward(self, count):
+        if self.at_book_end:
+            return
+        for text, start, end in islice(paginate(self._elements, self._model, self._end), count):
+            self._starts.append(start)
+            self._texts.append(text)
+            self._end = end
+
+        # Ograniczamy pamięć - odrzucamy najstarsze strony
+        excess = len(self._texts) - self.MAX_PAGES
+        if excess > 0:
+            del self._starts[:excess]
+            del self._texts[:excess]
+            self._first += excess
+
+    def extend_backward(self, count=RADIUS):
+        """Paginuje `count` stron przed oknem. Zwraca liczbę dodanych stron."""
+        if self.at_book_start:
+            return 0
+
+        target = self._starts[0]
+        # Punkt startu: cofamy się o tyle treści, ile zajmuje count+1 stron
+        position = max(0, self._position(target) - (count + 1) * self._avg_page_size())
+        element = min(bisect_left(self._sizes, position), target[0])
+        start = (element, 0)
+
+        starts, texts = [], []
+        for text, page_start, page_end in paginate(self._elements, self._model, start):
+            if page_start >= target:
+                break
+            if page_end > target:
+                # Ostatnia strona przed oknem kończy się dokładnie na kotwicy okna
+                text = slice_text(self._elements, page_start, target)
+            starts.append(page_start)
+            texts.append(text)
+
+        starts, texts = starts[-count:], texts[-count:]
+        self._starts[:0] = starts
+        self._texts[:0] = texts
+        self._first -= len(texts)
+
+        excess = len(self._texts) - self.MAX_PAGES
+        if excess > 0:
+            # Koniec okna to teraz początek pierwszej odrzuconej strony
+            self._end = self._starts[-excess]
+            del self._starts[-excess:]
+            del self._texts[-excess:]
+
+        self._normalize()
+
+        return len(texts)
+
+    # ===== INTERFEJS LISTY =====
+    def __len__(self):
+        known = self._first + len(self._texts)
+        if self.at_book_end:
+            return known
+        remaining = self._total_size - self._position(self._end)
+        return known + max(1, math.ceil(remaining / self._avg_page_size()))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+
+        last = self._first + len(self._texts)
+
+        if last <= index < last + self.RADIUS:
+            self._extend_forward(index - last + 1 + self.RADIUS)
+        elif self._first - self.RADIUS <= index < self._first:
+            before = self._first
+            added = self.extend_backward(self._first - index + self.RADIUS)
+            # extend_backward mógł przenumerować strony
+            index += self._first - (before - added)
+            index = max(index, self._first)
+        elif not self._first <= index < last:
+            # Daleki skok (suwak) - nowe okno w szacowanym miejscu książki
+            self._reset(self._anchor_for_index(index), index)
+            # Strona na kotwicy okna (numeracja mogła się przesunąć)
+            index = self._first
+        elif last - index <= 1:
+            # Czytamy ostatnią stronę okna - dopaginujemy kolejne zawczasu
+            self._extend_forward(self.RADIUS)
+
+        return self._texts[index - self._first]
+
+    def anchor_of(self, index):
+        """Kotwica początku strony `index` (strona musi być w oknie)."""
+        return self._starts[index - self._first]
+
+    def index_of(self, anchor):
+        """Numer strony w oknie zawierającej kotwicę albo None."""
+        anchor = tuple(anchor)
+        if not self._starts or anchor < self._starts[0] or anchor >= self._end:
+            return None
+        return self._first + bisect_right(self._starts, anchor) - 1
+
+
+class IndexedPages(Sequence):
+    """Strony odtwarzane z elementów książki i zapisanego indeksu kotwic.
+
+    Tekst strony to slice_text między kotwicą jej początku a początkiem
+    następnej, więc nie trzeba trzymać (ani zapisywać) tekstu całej książki.
+    """
+
+    def __init__(self, elements, page_starts):
+        self._elements = elements
+        self._starts = page_starts
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+
+        end = self._starts[index + 1] if index + 1 < len(self) else (len(self._elements), 0)
+        return slice_text(self._elements, self._starts[index], end)
@@ -1,13 +1,41 @@
+import threading
+import time
+from itertools import chain
 from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.uix.textinput import TextInput
 from kivy.core.window import Window
 
+from core.element_stream import ElementStream
+from core.page_layout import PageLayoutModel, paginate
+from core.text_metrics import GlyphWidthTable
+from core.token_index import TokenIndex
+
+
+def layout_signature(app):
+    """Opis układu strony (okno, wysokość czytnika, czcionka) - strony i ich
+    kotwice są ważne tylko dla tego samego układu."""
+    return f"{int(Window.width)}x{int(app.get_reader_height())}@{int(dp(18))}"
+
+
+# Znaki mierzone z góry dla ElementStream (reszty książki jeszcze nie znamy):
+# ASCII, Latin-1, Latin Extended-A, cyrylica i typografia
+STREAM_PRELOAD_CHARS = (
+    "".join(map(chr, range(0x20, 0x7F)))
+    + "".join(map(chr, range(0xA0, 0x180)))
+    + "".join(map(chr, range(0x400, 0x460)))
+    + "–—‘’‚“”„…«»•"
+)
+
+
 class PaginationEngine:
     def __init__(self, app, structured_data, on_progress, on_complete):
         self.app = app
         self._elements = structured_data 
         self._element_index = 0
+        # Reszta akapitu dłuższego niż ekran (dane wejściowe są tylko do odczytu,
+        # np. CachedElements z BookCache)
+        self._split_element = None
         self._current_page_content = []
         self._pages = []
         
@@ -57,7 +85,7 @@ class PaginationEngine:
                 self.on_complete(self._pages)
                 return
 
-            element = self._elements[self._element_index]
+            element = self._split_element or self._elements[self._element_index]
             formatted_text = self._format_element(element)
             
             # Pomiar: czy element mieści się na stronie
@@ -67,6 +95,7 @@ class PaginationEngine:
             if self._ti.minimum_height <= self._ti.height:
                 self._current_page_content.append(formatted_text)
                 self._element_index += 1
+                self._split_element = None
             else:
                 if self._current_page_content:
                     # Zamykamy stronę, element przechodzi na następną
@@ -89,9 +118,9 @@ class PaginationEngine:
                             # Strona pełna - zapisujemy i resztę słów wracamy do listy elementów
                             self._pages.append(" ".join(temp_page_words))
                             
-                            # WAŻNE: Aktualizujemy element w liście, by nie zgubić słów
+                            # WAŻNE: Zapamiętujemy resztę akapitu, by nie zgubić słów
                             remaining_text = " ".join(words[i:])
-                            self._elements[self._element_index] = {
+                            self._split_element = {
                                 'type': element['type'],
                                 'content': remaining_text
                             }
@@ -101,8 +130,180 @@ class PaginationEngine:
                         # Jeśli akapit się skończył (pętla for-else)
                         self._current_page_content = [" ".join(temp_page_words)]
                         self._element_index += 1
+                        self._split_element = None
 
         if total > 0:
             self.on_progress((self._element_index / total) * 100)
         
-        Clock.schedule_once(self._paginate_step, 0.005)
\ No newline at end of file
+        Clock.schedule_once(self._paginate_step, 0.005)
+
+
+class MetricsPaginationEngine:
+    """Paginacja bez pomiarów TextInput.
+
+    Szerokości glifów są mierzone raz na czcionkę i rozmiar (GlyphWidthTable),
+    a łamanie linii liczy PageLayoutModel w czystym Pythonie. Interfejs jak
+    w PaginationEngine, strony zgodne z nim w granicach kerningu.
+    """
+
+    # Ile czasu na klatkę może zająć paginacja (s)
+    FRAME_BUDGET = 0.012
+
+    def __init__(self, app, structured_data, on_progress, on_complete):
+        self.app = app
+        self._elements = structured_data
+        self._pages = []
+
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+
+        # Te same wymiary co TextInput w PaginationEngine i ReaderScreen
+        side_margin = dp(20)
+        glyphs = GlyphWidthTable.get(dp(18))
+
+        self.layout_model = PageLayoutModel(
+            glyphs.width,
+            width=Window.width,
+            height=self.app.get_reader_height(),
+            line_height=glyphs.line_height,
+            padding=[side_margin, dp(10), side_margin, dp(10)],
+            exact_width=glyphs.text_width,
+        )
+        self._page_iter = paginate(self._elements, self.layout_model)
+
+    def start(self):
+        if not self._elements:
+            self.on_complete([])
+            return
+        Clock.schedule_once(self._paginate_step, 0)
+
+    def cancel(self):
+        Clock.unschedule(self._paginate_step)
+
+    def _paginate_step(self, dt):
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        total = len(self._elements)
+
+        for text, _, end in self._page_iter:
+            self._pages.append(text)
+            if time.perf_counter() > deadline:
+                self.on_progress((end[0] / total) * 100)
+                Clock.schedule_once(self._paginate_step, 0)
+                return
+
+        self.on_complete(self._pages)
+
+
+class ThreadedPaginationEngine:
+    """Paginacja w wątku w tle z modelem opartym wyłącznie na tabeli szerokości.
+
+    Gotowe strony trafiają partiami (przez Clock, w wątku Kivy) do listy
+    `pages` (a ich kotwice początku do `page_starts`) i do `on_pages`, więc
+    czytnik może się otworzyć, zanim powstanie cała książka. Ten sam
+    `layout_model` może równolegle paginować PageWindow w wątku Kivy.
+    `page_starts` to tablica strona -> kotwica; odwrotnie szukamy bisekcją.
+    Razem ze stroną powstaje jej TokenIndex (`page_tokens`) - granice słów
+    do tapnięć.
+    Bez dokładnych pomiarów kerningu - CoreLabel nie może być używany poza
+    wątkiem Kivy.
+    """
+
+    # Co ile sekund wątek publikuje nowe strony
+    PUBLISH_INTERVAL = 0.05
+
+    def __init__(self, app, structured_data, on_progress, on_complete, on_pages=None, on_error=None):
+        self.app = app
+        self._elements = structured_data
+        self.pages = []
+        self.page_starts = []
+        self.page_tokens = []
+        self.layout = layout_signature(app)
+
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_pages = on_pages
+        self.on_error = on_error
+        self._cancelled = threading.Event()
+
+        side_margin = dp(20)
+        glyphs = GlyphWidthTable.get(dp(18))
+        # Mierzymy z góry wszystkie znaki książki, wątek czyta już tylko słownik.
+        # Strumień zna tylko początek - do niego typowy zestaw znaków
+        texts = (el.get('content', '') for el in structured_data)
+        if isinstance(structured_data, ElementStream):
+            texts = chain(texts, [STREAM_PRELOAD_CHARS])
+        widths = glyphs.snapshot(texts)
+        fallback = glyphs.width("n")
+
+        self.layout_model = PageLayoutModel(
+            lambda ch: widths.get(ch, fallback),
+            width=Window.width,
+            height=self.app.get_reader_height(),
+            line_height=glyphs.line_height,
+            padding=[side_margin, dp(10), side_margin, dp(10)],
+        )
+
+    def start(self):
+        if not self._elements:
+            self.on_complete([])
+            return
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _run(self):
+        try:
+            self._paginate()
+        except Exception as e:
+            # Bez tego wątek ginie po cichu, a ekran ładowania zostaje na zawsze
+            print(f"Pagination error: {e}")
+            Clock.schedule_once(lambda dt, error=e: self._fail(error))
+
+    def _fail(self, error):
+        # Wątek Kivy
+        if self._cancelled.is_set():
+            return
+        if self.on_error:
+            self.on_error(error)
+
+    def _paginate(self):
+        total = len(self._elements)
+        # Strumień nie zna swojej długości - postęp podaje sam (np. rozdziały EPUB)
+        streaming = isinstance(self._elements, ElementStream)
+        batch = []
+        # Pierwszą stronę publikujemy od razu, kolejne partiami
+        last_publish = 0.0
+
+        for text, start, end in paginate(self._elements, self.layout_model):
+            if self._cancelled.is_set():
+                return
+            batch.append((text, start, TokenIndex(text)))
+
+            now = time.perf_counter()
+            if now - last_publish >= self.PUBLISH_INTERVAL:
+                progress = self._elements.progress if streaming else (end[0] / total) * 100
+                self._schedule_publish(batch, progress)
+                batch = []
+                last_publish = now
+
+        self._schedule_publish(batch, 100, done=True)
+
+    def _schedule_publish(self, batch, progress, done=False):
+        Clock.schedule_once(lambda dt: self._publish(batch, progress, done))
+
+    def _publish(self, batch, progress, done):
+        # Wątek Kivy
+        if self._cancelled.is_set():
+            return
+
+        self.pages.extend(text for text, _, _ in batch)
+        self.page_starts.extend(start for _, start, _ in batch)
+        self.page_tokens.extend(tokens for _, _, tokens in batch)
+        if batch and self.on_pages:
+            self.on_pages(self.pages)
+
+        if done:
+            self.on_complete(self.pages)
+        else:
+            self.on_progress(progress)
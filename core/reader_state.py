@@ -1,12 +1,39 @@
-from kivy.storage.jsonstore import JsonStore
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+from core.write_behind_store import WriteBehindJsonStore
 from kivy.uix.textinput import TextInput
 from core.utils import book_id
+from core.book_cache import BookCache
+from core.page_window import IndexedPages
+from core.token_index import TokenIndex
 
 
 class ReaderStateManager:
-    def __init__(self, store_path="reader_state.json"):
-        self.store = JsonStore(store_path)
+    # Ile TokenIndex stron spoza paginacji w tle (okno, indeks stron) trzymamy
+    TOKEN_CACHE_SIZE = 8
+
+    def __init__(self, store_path="reader_state.json", backend="json"):
+        if backend == "sqlite":
+            # sqlite3 ładujemy tylko dla tego backendu
+            from core.sqlite_store import SQLiteStore, default_database_path
+            self.store = SQLiteStore(default_database_path(), "reader_state")
+            self.store.migrate_json(store_path)
+        else:
+            self.store = WriteBehindJsonStore(store_path)
+            if not os.path.exists(store_path) and os.path.exists(store_path + ".migrated"):
+                # Powrót z SQLite - pozycje są w bazie, plik przeniósł migrate_json
+                from core.sqlite_store import restore_json
+                restore_json("reader_state", self._restore)
         self.pages = []
+        # Kotwice (indeks elementu, offset znaku) początków stron i układ, dla którego powstały
+        self.page_starts = []
+        # TokenIndex stron z paginacji w tle (równolegle do pages)
+        self.page_tokens = []
+        self._token_cache = OrderedDict()
+        self.layout = None
+        # False, dopóki paginacja w tle jeszcze dokłada strony
+        self.pages_complete = True
         self.current_page = 0
         self.current_book_id = None
         self.current_path = None
@@ -15,17 +42,32 @@ class ReaderStateManager:
         else:
             self.current_book_id = None
 
-    def load_cached_state(self):
+    def _restore(self, items):
+        for key, values in items:
+            self.store.store_put(key, values)
+        self.store.flush()
+
+    def load_cached_state(self, elements, layout):
+        """Odtwarza strony z elementów książki i indeksu stron zapisanego dla układu `layout`."""
         if not self.current_book_id:
             return False
 
-        if self.store.exists(self.current_book_id):
-            data = self.store.get(self.current_book_id)
-            self.pages = data.get("pages", [])
-            self.current_page = data.get("page", 0)
-            return bool(self.pages)
+        page_starts = BookCache.load_page_index(self.current_book_id, layout)
+        if not page_starts:
+            # Brak indeksu albo inny rozmiar okna/czcionki - strony trzeba policzyć od kotwicy
+            return False
+
+        self.page_starts = page_starts
+        self.pages = IndexedPages(elements, page_starts)
+        self.layout = layout
+        self.pages_complete = True
 
-        return False
+        anchor = self.get_saved_anchor()
+        if anchor is not None:
+            self.current_page = self.page_for_anchor(anchor)
+        else:
+            self.current_page = min(self.get_saved_page(), len(self.pages) - 1)
+        return True
 
     def set_current_file(self, filepath, bid=None):
         # Jeśli nie podano ID, próbujemy wygenerować (ale lepiej podawać)
@@ -44,6 +86,9 @@ class ReaderStateManager:
         # Jeśli otwieramy inną książkę niż poprzednio, czyścimy cache w pamięci RAM
         if is_new_book:
             self.pages = []
+            self.page_starts = []
+            self.page_tokens = []
+            self._token_cache.clear()
             self.current_page = 0
             print(f"New book detected. ID: {bid}")
         else:
@@ -55,12 +100,29 @@ class ReaderStateManager:
         if not self.current_book_id:
             return
 
+        # Tylko mały rekord pozycji - strony odtwarzamy z indeksu (save_page_index)
+        anchor = self.current_anchor()
+        total = len(self.pages)
+        if not self.pages_complete and not hasattr(self.pages, "estimated"):
+            # Paginacja w tle jeszcze trwa - zostawiamy poprzednią liczbę stron
+            total = max(total, self.get_book_progress_data(self.current_book_id).get("total", 0))
+
         self.store.put(
             self.current_book_id,
             page=self.current_page,
-            pages=self.pages   # 🔥 ZAPIS STRON
+            anchor=list(anchor) if anchor is not None else None,
+            total=total
         )
 
+    def save_page_index(self):
+        """Zapisuje granice stron gotowej paginacji (raz na paginację)."""
+        if not self.current_book_id or not self.pages_complete or not self.layout:
+            return
+        try:
+            BookCache.save_page_index(self.current_book_id, self.layout, self.page_starts)
+        except OSError as e:
+            print(f"Page index write error: {e}")
+
     def restore_position(self):
         if not self.current_book_id:
             return 0
@@ -71,6 +133,69 @@ class ReaderStateManager:
         page = self.store.get(self.current_book_id).get("page", 0)
         return min(page, len(self.pages) - 1)
 
+    def get_saved_page(self):
+        """Zapisany numer strony bez przycinania do liczby gotowych stron."""
+        if self.current_book_id and self.store.exists(self.current_book_id):
+            return self.store.get(self.current_book_id).get("page", 0)
+        return 0
+
+    def get_saved_anchor(self):
+        """Zapisana kotwica pozycji (indeks elementu, offset znaku) albo None."""
+        if self.current_book_id and self.store.exists(self.current_book_id):
+            anchor = self.store.get(self.current_book_id).get("anchor")
+            if anchor:
+                return tuple(anchor)
+        return None
+
+    def current_anchor(self):
+        """Kotwica początku bieżącej strony (niezależna od układu strony)."""
+        if hasattr(self.pages, "anchor_of"):
+            return self.pages.anchor_of(self.current_page)
+        if 0 <= self.current_page < len(self.page_starts):
+            return tuple(self.page_starts[self.current_page])
+        return None
+
+    def tokens_for(self, index):
+        """TokenIndex strony `index` - z paginacji albo liczony raz dla strony."""
+        if isinstance(self.pages, list) and index < len(self.page_tokens):
+            return self.page_tokens[index]
+
+        if hasattr(self.pages, "anchor_of"):
+            anchor = self.pages.anchor_of(index)
+        elif index < len(self.page_starts):
+            anchor = tuple(self.page_starts[index])
+        else:
+            return TokenIndex(self.pages[index])
+
+        # Kotwica wyznacza stronę tylko w obrębie jednego układu
+        key = (self.layout, anchor)
+        tokens = self._token_cache.get(key)
+        if tokens is None:
+            tokens = TokenIndex(self.pages[index])
+            self._token_cache[key] = tokens
+            if len(self._token_cache) > self.TOKEN_CACHE_SIZE:
+                self._token_cache.popitem(last=False)
+        else:
+            self._token_cache.move_to_end(key)
+        return tokens
+
+    def page_for_anchor(self, anchor):
+        """Numer strony zawierającej kotwicę (wg page_starts)."""
+        return max(0, bisect_right(self.page_starts, tuple(anchor)) - 1)
+
+    def can_turn_back(self):
+        # W trybie okna (PageWindow) strona 0 nie musi być początkiem książki
+        if self.current_page > 0:
+            return True
+        return not getattr(self.pages, "at_book_start", True)
+
+    def turn_back(self):
+        if self.current_page == 0 and hasattr(self.pages, "extend_backward"):
+            # Dopaginowanie wstecz przenumeruje strony (i current_page) przez on_reindex
+            self.pages.extend_backward()
+        if self.current_page > 0:
+            self.current_page -= 1
+
     def remove_file_state_by_id(self, book_id):
         if self.store.exists(book_id):
             self.store.delete(book_id)
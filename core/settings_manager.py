@@ -1,5 +1,5 @@
 import os
-from kivy.storage.jsonstore import JsonStore
+from core.write_behind_store import WriteBehindJsonStore
 
 
 class SettingsManager:
@@ -8,7 +8,7 @@ class SettingsManager:
         data_dir = os.path.join(base_dir, "..", "data")
         os.makedirs(data_dir, exist_ok=True)
 
-        self.store = JsonStore(os.path.join(data_dir, filename))
+        self.store = WriteBehindJsonStore(os.path.join(data_dir, filename))
 
     # ===== LANGUAGE =====
     def get_language(self):
@@ -51,6 +51,45 @@ class SettingsManager:
     def set_open_last_book(self, value):
         self.store.put("open_last_book", active=value)
 
+    # === STORAGE ===
+    def get_storage_backend(self):
+        # "json" (domyślnie) albo "sqlite"; zmiana działa po restarcie aplikacji
+        if self.store.exists("storage"):
+            return self.store.get("storage").get("backend", "json")
+        return "json"
+
+    def set_storage_backend(self, backend):
+        self.store.put("storage", backend=backend)
+
+    # === PREFETCH ===
+    PREFETCH_DEFAULTS = {
+        "enabled": False,     # prefetch zużywa transfer - domyślnie wyłączony
+        "pages": 2,           # ile kolejnych stron (poza bieżącą)
+        "max_requests": 200,  # limit zapytań na sesję
+        "max_chars": 3000,    # limit wysłanych znaków na sesję
+    }
+
+    def get_prefetch_settings(self):
+        settings = dict(self.PREFETCH_DEFAULTS)
+        if self.store.exists("prefetch"):
+            settings.update(self.store.get("prefetch"))
+        return settings
+
+    def set_prefetch_enabled(self, value):
+        settings = self.get_prefetch_settings()
+        settings["enabled"] = value
+        self.store.put("prefetch", **settings)
+
+    # === ZAPISANE SŁOWA ===
+    def get_mark_saved_enabled(self):
+        # Zaznaczanie na stronie słów, które są już w słowniku
+        if self.store.exists("mark_saved"):
+            return self.store.get("mark_saved").get("enabled", True)
+        return True
+
+    def set_mark_saved_enabled(self, value):
+        self.store.put("mark_saved", enabled=value)
+
     # === HIGHLIGHT ===
     def get_highlight_enabled(self):
         # Sprawdzamy czy klucz istnieje w JsonStore
@@ -1,24 +1,51 @@
 import os
-from kivy.storage.jsonstore import JsonStore
+import zipfile
+import xml.etree.ElementTree as ET
+from core.write_behind_store import WriteBehindJsonStore
+from core.book_cache import BookCache
+from core.fb2_archive import split_book_name
+from core.epub_loader import read_epub_metadata
+from core.fb2_metadata import read_fb2_metadata
+
+# Dodatkowe metadane z <description> zapisywane przy książce
+METADATA_FIELDS = ("language", "series", "series_index", "genres", "annotation", "cover")
 
 class ShelfManager:
-    def __init__(self, filename="shelf.json"):
+    def __init__(self, filename="shelf.json", backend="json"):
         base_dir = os.path.dirname(__file__)
         data_dir = os.path.join(base_dir, "..", "data")
         os.makedirs(data_dir, exist_ok=True)
+        json_path = os.path.join(data_dir, filename)
+
+        if backend == "sqlite":
+            # sqlite3 ładujemy tylko dla tego backendu
+            from core.sqlite_store import SQLiteStore, default_database_path
+            self.store = SQLiteStore(default_database_path(), "books", indexed=("title", "author"))
+            self.store.migrate_json(json_path)
+        else:
+            self.store = WriteBehindJsonStore(json_path)
+            if not os.path.exists(json_path) and os.path.exists(json_path + ".migrated"):
+                # Powrót z SQLite - półka jest w bazie, plik przeniósł migrate_json
+                from core.sqlite_store import restore_json
+                restore_json("books", self._restore)
 
-        self.store = JsonStore(os.path.join(data_dir, filename))
+    def _restore(self, items):
+        for key, values in items:
+            self.store.store_put(key, values)
+        self.store.flush()
 
     def get_books(self):
         books = []
         for key in self.store.keys():
             data = self.store.get(key)
-            books.append({
+            book = {
                 "id": key,
                 "path": data.get("path", ""),
                 "title": data.get("title", "Unknown"),
                 "author": data.get("author", "Unknown Author")
-            })
+            }
+            book.update((field, data[field]) for field in METADATA_FIELDS if field in data)
+            books.append(book)
         return books
 
     def add_book(self, book: dict):
@@ -27,12 +54,70 @@ class ShelfManager:
         if self.store.exists(bid):
             return
 
-        self.store.put(
-            bid,
-            path=book["path"],
-            title=book["title"],
-            author=book.get("author", "Unknown Author")
-        )
+        self.store.put(bid, **self._entry(book))
+
+    def add_books(self, books):
+        """Dodaje wiele książek jednym zapisem (import folderu); zwraca liczbę nowych."""
+        added = 0
+        for book in books:
+            if self.store.exists(book["id"]):
+                continue
+            self.store.store_put(book["id"], self._entry(book))
+            added += 1
+        if added:
+            self.store.store_sync()
+        return added
+
+    @staticmethod
+    def _entry(book):
+        entry = {
+            "path": book["path"],
+            "title": book["title"],
+            "author": book.get("author", "Unknown Author"),
+        }
+        entry.update((field, book.get(field)) for field in METADATA_FIELDS)
+        return entry
+
+    def rebuild(self, books_dir):
+        """Uzupełnia półkę z katalogu książek: nowe pliki i brakujące metadane.
+
+        Z każdej książki czytamy tylko nagłówek (<description>), więc koszt
+        nie zależy od jej rozmiaru. Zwraca liczbę zmienionych wpisów.
+        """
+        if not os.path.isdir(books_dir):
+            return 0
+
+        changed = 0
+        for filename in sorted(os.listdir(books_dir)):
+            bid, ext = split_book_name(filename)
+            ext = ext.lower()
+            if ext not in (".fb2", ".fb2.zip", ".epub"):
+                continue
+            data = self.store.get(bid) if self.store.exists(bid) else None
+            if data is not None and "language" in data:
+                continue
+
+            path = os.path.join(books_dir, filename)
+            try:
+                if ext == ".epub":
+                    metadata = read_epub_metadata(path)
+                else:
+                    metadata = read_fb2_metadata(path)
+            except (OSError, ValueError, KeyError, ET.ParseError, zipfile.BadZipFile) as e:
+                print(f"Shelf rebuild error {path}: {e}")
+                continue
+
+            # Tytuł i autor z półki (mogły być ustawione wcześniej) mają pierwszeństwo
+            data = dict(data or {})
+            self.store.put(
+                bid,
+                path=data.get("path", path),
+                title=data.get("title") or metadata["title"] or filename,
+                author=data.get("author") or metadata["author"],
+                **{field: metadata[field] for field in METADATA_FIELDS}
+            )
+            changed += 1
+        return changed
 
     def remove_book(self, book_id: str):
         if self.store.exists(book_id):
@@ -41,6 +126,7 @@ class ShelfManager:
             
             # Usuwamy wpis z półki
             self.store.delete(book_id)
+            BookCache.remove(book_id)
             
             # Usuwamy plik książki jeśli istnieje
             if path and os.path.exists(path):
@@ -49,6 +135,12 @@ class ShelfManager:
                 except Exception as e:
                     print(f"Error deleting file {path}: {e}")
 
+    def get_language(self, book_id):
+        """Język książki z metadanych (np. "pl") albo None."""
+        if book_id and self.store.exists(book_id):
+            return self.store.get(book_id).get("language")
+        return None
+
     def get_last_book(self):
         keys = list(self.store.keys())
         if not keys:
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+from kivy.storage import AbstractStore
+from kivy.storage.jsonstore import JsonStore
+
+
+def default_database_path():
+    base_dir = os.path.dirname(__file__)
+    data_dir = os.path.join(base_dir, "..", "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "linguobook.db")
+
+
+class SQLiteStore(AbstractStore):
+    """Sklep klucz-wartość Kivy w tabeli SQLite (zamiennik JsonStore).
+
+    Każdy klucz to osobny wiersz (klucz główny + wartości jako JSON), więc
+    get/put/delete dotyczą tylko jednego wiersza. Wybrane pola wartości
+    (`indexed`) trafiają też do osobnych kolumn z indeksem - find() po nich
+    idzie przez indeks zamiast przeglądać wszystkie wiersze.
+    """
+
+    _connections = {}
+
+    def __init__(self, db_path, table, indexed=(), **kwargs):
+        self.db_path = db_path
+        self.table = table
+        self.indexed = tuple(indexed)
+        super().__init__(**kwargs)
+
+    @classmethod
+    def get_connection(cls, db_path):
+        conn = cls._connections.get(db_path)
+        if conn is None:
+            conn = cls._connections[db_path] = sqlite3.connect(db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def store_load(self):
+        self._conn = self.get_connection(self.db_path)
+        columns = "".join(f", {name} TEXT" for name in self.indexed)
+        # rowid zachowuje kolejność dodawania, jak klucze w JsonStore
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL{columns})")
+        for name in self.indexed:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{name} ON {self.table} ({name})")
+        self._conn.commit()
+
+    def store_sync(self):
+        self._conn.commit()
+
+    def store_exists(self, key):
+        row = self._conn.execute(f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def store_get(self, key):
+        row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def store_put(self, key, value):
+        names = ("key", "value") + self.indexed
+        params = [key, json.dumps(value)] + [value.get(name) for name in self.indexed]
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+        # UPSERT zamiast REPLACE - wiersz zachowuje swój rowid (kolejność)
+        self._conn.execute(
+            f"INSERT INTO {self.table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT(key) DO UPDATE SET {updates}",
+            params)
+        return True
+
+    def store_delete(self, key):
+        cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        if not cursor.rowcount:
+            raise KeyError(key)
+        return True
+
+    def store_find(self, filters):
+        # Filtry po kolumnach z indeksem idą do SQL, resztę sprawdzamy w Pythonie
+        sql_filters = {k: v for k, v in filters.items() if k in self.indexed}
+        where = " AND ".join(f"{name} = ?" for name in sql_filters)
+        query = f"SELECT key, value FROM {self.table}"
+        if where:
+            query += f" WHERE {where}"
+
+        for key, data in self._conn.execute(query + " ORDER BY rowid", tuple(sql_filters.values())):
+            values = json.loads(data)
+            if all(k in values and values[k] == v for k, v in filters.items()):
+                yield key, values
+
+    def store_count(self):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def store_keys(self):
+        return [row[0] for row in self._conn.execute(f"SELECT key FROM {self.table} ORDER BY rowid")]
+
+    def store_clear(self):
+        self._conn.execute(f"DELETE FROM {self.table}")
+        self.store_sync()
+        return True
+
+    def items(self):
+        """Wszystkie pary (klucz, wartości) jednym zapytaniem."""
+        return self.store_find({})
+
+    def replace_all(self, pairs):
+        """Zastępuje zawartość tabeli parami (klucz, wartości) w jednej transakcji."""
+        try:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            for key, values in pairs:
+                self.store_put(key, values)
+            self.store_sync()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def migrate_json(self, json_path, unpack=None):
+        """Import z pliku JsonStore przy przełączeniu na SQLite.
+
+        Plik istnieje tylko wtedy, gdy ostatnio działał backend JSON (po
+        imporcie dostaje rozszerzenie .migrated), więc jego zawartość
+        zastępuje tabelę - także po powrocie z JSON (restore_json).
+        `unpack(key, values)` może rozbić jeden wpis JSON na wiele par
+        (klucz, wartości).
+        """
+        if not os.path.exists(json_path):
+            return
+
+        try:
+            source = JsonStore(json_path)
+            pairs = []
+            for key in source.keys():
+                values = source.get(key)
+                pairs.extend(unpack(key, values) if unpack else ((key, values),))
+            self.replace_all(pairs)
+            os.replace(json_path, json_path + ".migrated")
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Migration error for {json_path}: {e}")
+
+
+def restore_json(table, write, db_path=None):
+    """Powrót z SQLite do plików: wiersze tabeli `table` trafiają do `write(pary)`.
+
+    Tabeli nie czyścimy - jeśli zapis pliku się nie uda, kolejne uruchomienie
+    spróbuje znowu, a przy ponownym przełączeniu na SQLite migrate_json
+    zastąpi tabelę odtworzonym plikiem. Zwraca liczbę przeniesionych wpisów.
+    """
+    db_path = db_path or default_database_path()
+    if not os.path.exists(db_path):
+        return 0
+    try:
+        items = list(SQLiteStore(db_path, table).items())
+        if items:
+            write(items)
+        return len(items)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Migration error for {table}: {e}")
+        return 0
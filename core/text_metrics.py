@@ -0,0 +1,70 @@
+from kivy.core.text import Label as CoreLabel
+
+# Zakresy mierzone z góry: ASCII, Latin-1, Latin Extended-A (pl, cs),
+# cyrylica (uk) i typograficzne myślniki/cudzysłowy
+_PRELOAD_RANGES = (
+    (0x0020, 0x007F),
+    (0x00A0, 0x0180),
+    (0x0400, 0x0460),
+    (0x2010, 0x2027),
+)
+
+
+class GlyphWidthTable:
+    """Szerokości znaków dla jednej czcionki i rozmiaru, mierzone raz przez CoreLabel.
+
+    Ten sam Label co w TextInput, więc szerokości i wysokość linii zgadzają się
+    z tym, co pokazuje ReaderTextInput (bez kerningu między znakami).
+    """
+
+    _tables = {}
+
+    def __init__(self, font_size, font_name="Roboto"):
+        self._label = CoreLabel(font_size=font_size, font_name=font_name)
+        self._widths = {}
+        self._text_widths = {}
+        # TextInput liczy wysokość linii z wysokości znaku '_'
+        self.line_height = self._label.get_extents("_")[1]
+
+        for first, last in _PRELOAD_RANGES:
+            self.preload(chr(cp) for cp in range(first, last))
+
+    @classmethod
+    def get(cls, font_size, font_name="Roboto"):
+        key = (font_name, font_size)
+        table = cls._tables.get(key)
+        if table is None:
+            table = cls._tables[key] = cls(font_size, font_name)
+        return table
+
+    def preload(self, chars):
+        for ch in chars:
+            if ch not in self._widths:
+                self._widths[ch] = self._label.get_extents(ch)[0]
+
+    def snapshot(self, texts):
+        """Kopia tabeli ze zmierzonymi wszystkimi znakami z `texts` (także wielkimi literami).
+
+        Pomiar wymaga wątku Kivy; gotowy słownik można czytać z innego wątku.
+        """
+        chars = set()
+        for text in texts:
+            chars.update(text)
+            chars.update(text.upper())
+        self.preload(chars)
+        return dict(self._widths)
+
+    def width(self, ch):
+        try:
+            return self._widths[ch]
+        except KeyError:
+            w = self._widths[ch] = self._label.get_extents(ch)[0]
+            return w
+
+    def text_width(self, text):
+        # Dokładny pomiar całego tekstu (z kerningiem), tak jak TextInput._get_text_width
+        try:
+            return self._text_widths[text]
+        except KeyError:
+            w = self._text_widths[text] = self._label.get_extents(text)[0]
+            return w
@@ -0,0 +1,45 @@
+import re
+import sys
+from array import array
+from bisect import bisect_right
+
+# Słowo: litery, także połączone łącznikiem lub apostrofem ("well-known", "don't")
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:[-‐'’][^\W\d_]+)*")
+
+
+def normalize_token(word):
+    return word.lower().replace("’", "'").replace("‐", "-")
+
+
+class TokenIndex:
+    """Granice słów jednej strony: początki i końce w tablicach array('I').
+
+    Powstaje przy paginacji (w wątku w tle), więc tapnięcie w tekst to tylko
+    bisekcja po offsetach - bez skanowania znaków wokół kursora. `forms` to
+    znormalizowane formy słów (małe litery, proste apostrofy); takie same
+    formy są współdzielone (sys.intern).
+    """
+
+    __slots__ = ("starts", "ends", "forms")
+
+    def __init__(self, text):
+        self.starts = array("I")
+        self.ends = array("I")
+        self.forms = []
+        for match in _TOKEN_RE.finditer(text):
+            self.starts.append(match.start())
+            self.ends.append(match.end())
+            self.forms.append(sys.intern(normalize_token(match.group())))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, offset):
+        """Indeks słowa pod offsetem znaku (także tuż za jego końcem) albo -1."""
+        i = bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset <= self.ends[i]:
+            return i
+        return -1
+
+    def span(self, i):
+        return self.starts[i], self.ends[i]
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import sqlite3
+except ImportError:
+    # Build bez przepisu sqlite3 - zostaje sam cache w pamięci
+    sqlite3 = None
+
+
+class TranslationCache:
+    """Cache tłumaczeń: LRU w pamięci + trwała warstwa SQLite na dysku.
+
+    Klucz to (model, język źródłowy, język docelowy, znormalizowane słowo).
+    Wpisy na dysku wygasają po `ttl` sekundach, a gdy jest ich więcej niż
+    `max_disk_entries`, usuwamy najdawniej używane. Metody są bezpieczne
+    wątkowo - tłumaczenie działa w wątku w tle. Bez modułu sqlite3 cache
+    działa tylko w pamięci.
+    """
+
+    MEMORY_SIZE = 2000
+    MAX_DISK_ENTRIES = 50_000
+    TTL = 90 * 24 * 3600
+
+    def __init__(self, db_path, memory_size=MEMORY_SIZE, max_disk_entries=MAX_DISK_ENTRIES, ttl=TTL):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.persistent = sqlite3 is not None
+
+    @staticmethod
+    def normalize(word):
+        return word.strip().lower()
+
+    def _key(self, model, source, target, word):
+        return f"{model}|{source}|{target}|{self.normalize(word)}"
+
+    def _db(self):
+        # Połączenie otwieramy leniwie; używane z wielu wątków pod self._lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_used ON translations (used)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, model, source, target, word):
+        """Tłumaczenie z pamięci lub dysku albo None."""
+        key = self._key(model, source, target, word)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+            if not self.persistent:
+                return None
+
+            try:
+                db = self._db()
+                row = db.execute("SELECT value, created FROM translations WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > self.ttl:
+                    db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                    db.commit()
+                    return None
+                db.execute("UPDATE translations SET used = ? WHERE key = ?", (now, key))
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Translation cache error: {e}")
+                return None
+
+            self._remember(key, row[0])
+            return row[0]
+
+    def peek(self, model, source, target, word):
+        """Tłumaczenie tylko z pamięci, bez dysku i bez zmiany kolejności LRU."""
+        with self._lock:
+            return self._memory.get(self._key(model, source, target, word))
+
+    def cached_words(self, model, source, target, words):
+        """Zbiór słów z `words`, które mają tłumaczenie w pamięci lub na dysku.
+
+        Tylko odczyt: jedno zapytanie IN (...) na partię, bez UPDATE i commit
+        (w odróżnieniu od get) - do sprawdzania wielu słów naraz.
+        """
+        keys = {self._key(model, source, target, word): word for word in words}
+        found = set()
+        with self._lock:
+            missing = []
+            for key, word in keys.items():
+                if key in self._memory:
+                    found.add(word)
+                else:
+                    missing.append(key)
+            if not self.persistent:
+                return found
+            try:
+                db = self._db()
+                oldest = time.time() - self.ttl
+                # SQLite ogranicza liczbę parametrów zapytania
+                for i in range(0, len(missing), 500):
+                    part = missing[i:i + 500]
+                    rows = db.execute(
+                        f"SELECT key FROM translations WHERE key IN ({', '.join('?' * len(part))}) "
+                        "AND created >= ?", part + [oldest])
+                    found.update(keys[row[0]] for row in rows)
+            except sqlite3.Error as e:
+                print(f"Translation cache error: {e}")
+        return found
+
+    def put(self, model, source, target, word, value, persist=True):
+        key = self._key(model, source, target, word)
+        with self._lock:
+            self._remember(key, value)
+            if not persist or not self.persistent:
+                return
+            try:
+                db = self._db()
+                now = time.time()
+                db.execute(
+                    "INSERT INTO translations (key, value, created, used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, created = excluded.created, "
+                    "used = excluded.used",
+                    (key, value, now, now))
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._evict(db, now)
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Translation cache error: {e}")
+
+    def _evict(self, db, now):
+        # Wygasłe wpisy, potem nadmiar ponad limit (najdawniej używane)
+        db.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl,))
+        count = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY used LIMIT ?)", (excess,))
@@ -0,0 +1,174 @@
+import itertools
+import queue
+import threading
+from kivy.clock import Clock
+
+# Priorytety kolejki (mniejszy = wcześniej)
+PRIORITY_TAP = 0
+PRIORITY_PREFETCH = 10
+
+
+class TranslationTicket:
+    """Zgłoszenie jednego odbiorcy wyniku; cancel() - wynik nie zostanie dostarczony."""
+
+    __slots__ = ("callback", "cancelled", "done", "expired")
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+        self.done = False
+        self.expired = False    # wynik None z powodu przekroczenia czasu
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TranslationExecutor:
+    """Ograniczona pula wątków tłumaczeń z kolejką priorytetową.
+
+    Zamiast wątku na każde tapnięcie: `max_workers` wątków zdejmuje zadania
+    z kolejki. Identyczne zadania (ten sam klucz) w kolejce lub w trakcie
+    wykonania są łączone - backend pyta się raz, wynik dostają wszyscy
+    odbiorcy. Wyniki trafiają do callbacków w wątku Kivy; anulowane zgłoszenia
+    (zamknięty dialog) są pomijane. Po `timeout` sekundach odbiorca dostaje
+    None (ticket.expired). Klienty deep_translator pytają sieć bez limitu
+    czasu, więc wątek, którego zadanie trwa dłużej niż jego limit, uznajemy
+    za zawieszony: pula dostaje nowy wątek, a stary kończy się, gdy backend
+    w końcu odpowie - zawieszone zapytania nie blokują kolejnych tapnięć.
+    Porzuconych wątków jest najwyżej `max_abandoned`; powyżej limitu pula
+    czeka na zawieszony wątek zamiast dokładać kolejne (martwy dostawca nie
+    mnoży wątków).
+    """
+
+    MAX_WORKERS = 2
+    MAX_ABANDONED = 4
+    # Ile sekund czekamy na wynik z danego backendu
+    TIMEOUTS = {
+        "GoogleTranslator": 8,
+        "PonsTranslator": 12,
+        "LingueeTranslator": 12,
+    }
+    DEFAULT_TIMEOUT = 10
+
+    def __init__(self, max_workers=MAX_WORKERS, max_abandoned=MAX_ABANDONED):
+        self.max_workers = max_workers
+        self.max_abandoned = max_abandoned
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = {}      # klucz -> lista TranslationTicket
+        self._priority = {}     # klucz -> najlepszy priorytet w kolejce
+        self._running = set()
+        self._workers = []
+        self._current = {}      # wątek -> numer wykonywanego zadania
+        self._abandoned = set() # zawieszone wątki zastąpione nowymi
+
+    def timeout_for(self, model):
+        return self.TIMEOUTS.get(model, self.DEFAULT_TIMEOUT)
+
+    def submit(self, key, func, callback=None, priority=PRIORITY_TAP, timeout=None):
+        """Zleca func() pod kluczem `key`; zwraca TranslationTicket. Wołać z wątku Kivy."""
+        ticket = TranslationTicket(callback)
+
+        with self._lock:
+            tickets = self._pending.get(key)
+            if tickets is None:
+                self._pending[key] = [ticket]
+                self._enqueue(key, func, priority, timeout)
+            else:
+                tickets.append(ticket)
+                # Tapnięcie w słowo czekające na prefetch - wyprzedza kolejkę
+                if key not in self._running and priority < self._priority.get(key, priority + 1):
+                    self._enqueue(key, func, priority, timeout)
+
+        self._ensure_workers()
+        if timeout:
+            Clock.schedule_once(lambda dt: self._expire(ticket), timeout)
+        return ticket
+
+    def cancel(self, ticket):
+        if ticket is not None:
+            ticket.cancel()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _enqueue(self, key, func, priority, timeout):
+        self._priority[key] = priority
+        self._queue.put((priority, next(self._seq), key, func, timeout or self.DEFAULT_TIMEOUT))
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def _work(self):
+        worker = threading.current_thread()
+        while True:
+            _, run_id, key, func, timeout = self._queue.get()
+
+            with self._lock:
+                tickets = self._pending.get(key)
+                if tickets is None or key in self._running:
+                    # Duplikat wpisu (po podbiciu priorytetu) - już obsłużony
+                    continue
+                if all(t.cancelled or t.done for t in tickets):
+                    # Nikt już nie czeka na wynik (anulowane lub po czasie)
+                    del self._pending[key]
+                    self._priority.pop(key, None)
+                    continue
+                self._running.add(key)
+                self._current[worker] = run_id
+
+            Clock.schedule_once(lambda dt, w=worker, r=run_id: self._check_stuck(w, r), timeout)
+            try:
+                result = func()
+            except Exception as e:
+                print(f"Translation task error: {e}")
+                result = None
+
+            with self._lock:
+                self._current.pop(worker, None)
+                self._running.discard(key)
+                self._priority.pop(key, None)
+                tickets = self._pending.pop(key, [])
+                abandoned = worker in self._abandoned
+                self._abandoned.discard(worker)
+
+            Clock.schedule_once(lambda dt, t=tickets, r=result: self._deliver(t, r))
+            if abandoned:
+                # W puli działa już zastępczy wątek
+                return
+
+    def _check_stuck(self, worker, run_id):
+        # Wątek Kivy: zadanie nadal trwa po swoim limicie - wątek zastępujemy
+        with self._lock:
+            if self._current.get(worker) != run_id or worker not in self._workers:
+                return
+            if len(self._abandoned) >= self.max_abandoned:
+                print("Translation worker stuck, abandoned worker limit reached")
+                return
+            self._workers.remove(worker)
+            self._abandoned.add(worker)
+        print("Translation worker stuck, starting a replacement")
+        self._ensure_workers()
+
+    def _deliver(self, tickets, result):
+        for ticket in tickets:
+            self._finish(ticket, result)
+
+    def _expire(self, ticket):
+        if not (ticket.done or ticket.cancelled):
+            ticket.expired = True
+        self._finish(ticket, None)
+
+    @staticmethod
+    def _finish(ticket, result):
+        if ticket.done or ticket.cancelled:
+            return
+        ticket.done = True
+        if ticket.callback:
+            ticket.callback(result)
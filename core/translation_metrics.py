@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+
+# Górne granice przedziałów histogramu czasów (ms); ostatni przedział bez granicy
+LATENCY_BUCKETS_MS = (50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Histogram czasów w stałych przedziałach + suma i maksimum."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Górna granica przedziału, w którym wypada dany percentyl (ms) albo None."""
+        if not self.count:
+            return None
+        threshold = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                # Granica przedziału, ale nie więcej niż zmierzone maksimum
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], round(self.max_ms, 1))
+                return round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def to_dict(self):
+        labels = [f"<={limit}" for limit in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class ModelMetrics:
+    def __init__(self):
+        self.requests = LatencyHistogram()   # czas zapytania do backendu
+        self.taps = LatencyHistogram()       # od tapnięcia do wyniku w dialogu
+        self.errors = 0
+        self.empty = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.tap_errors = 0
+        self.tap_empty = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def to_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "requests": self.requests.to_dict(),
+            "tap_to_result": self.taps.to_dict(),
+            "errors": self.errors,
+            "empty": self.empty,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "tap_errors": self.tap_errors,
+            "tap_empty": self.tap_empty,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+        }
+
+
+class TranslationMetrics:
+    """Pomiary tłumaczeń w bieżącej sesji, osobno dla każdego modelu.
+
+    Zapytania do backendu (czas, błędy, puste wyniki) zapisuje
+    TranslatorRegistry.translate - wszystkie: tapnięcia, prefetch i
+    słownictwo - a dialog słowa trafienia w cache i czas
+    od tapnięcia do wyniku. Dane czyta panel w ustawieniach; `export`
+    zapisuje je jako JSON do porównania backendów na urządzeniu.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self.started = time.time()
+
+    def _model(self, model):
+        metrics = self._models.get(model)
+        if metrics is None:
+            metrics = self._models[model] = ModelMetrics()
+        return metrics
+
+    def record_request(self, model, seconds, outcome="ok"):
+        """outcome: 'ok', 'empty' (brak tłumaczenia) albo 'error'."""
+        with self._lock:
+            metrics = self._model(model)
+            metrics.requests.add(seconds * 1000)
+            if outcome == "error":
+                metrics.errors += 1
+            elif outcome == "empty":
+                metrics.empty += 1
+
+    def record_cache(self, model, hit):
+        with self._lock:
+            metrics = self._model(model)
+            if hit:
+                metrics.cache_hits += 1
+            else:
+                metrics.cache_misses += 1
+
+    def record_tap(self, model, seconds, outcome="ok"):
+        """outcome: 'ok', 'empty', 'error', 'timeout' albo 'cancelled' (dialog zamknięty przed wynikiem)."""
+        with self._lock:
+            metrics = self._model(model)
+            if outcome == "cancelled":
+                metrics.cancelled += 1
+                return
+            metrics.taps.add(seconds * 1000)
+            if outcome == "timeout":
+                metrics.timeouts += 1
+            elif outcome == "error":
+                metrics.tap_errors += 1
+            elif outcome == "empty":
+                metrics.tap_empty += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "duration_s": round(time.time() - self.started),
+                "models": {model: metrics.to_dict() for model, metrics in self._models.items()},
+            }
+
+    def summary(self):
+        """Krótki opis dla panelu w ustawieniach (linia na model)."""
+        models = self.snapshot()["models"]
+        if not models:
+            return "No translations yet."
+
+        lines = []
+        for model, data in sorted(models.items()):
+            requests = data["requests"]
+            hit_rate = data["cache_hit_rate"]
+            lines.append(
+                f"{model}: {requests['count']} req, "
+                f"p50 {requests['p50_ms'] or '-'} ms, p95 {requests['p95_ms'] or '-'} ms, "
+                f"{data['errors']} err, {data['timeouts']} timeout, "
+                f"cache {'-' if hit_rate is None else f'{hit_rate:.0%}'}, "
+                f"tap p50 {data['tap_to_result']['p50_ms'] or '-'} ms, "
+                f"{data['tap_errors']} tap err, {data['tap_empty']} tap empty"
+            )
+        return "\n".join(lines)
+
+    def export(self, directory):
+        """Zapisuje pomiary do pliku JSON w `directory`; zwraca ścieżkę."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("translation_metrics_%Y%m%d_%H%M%S.json"))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._models = {}
+            self.started = time.time()
@@ -0,0 +1,139 @@
+import re
+import threading
+from kivy.clock import Clock
+
+from core.translation_executor import PRIORITY_PREFETCH
+
+_WORD_RE = re.compile(r"[^\W\d_]{4,}")
+
+
+class TranslationPrefetcher:
+    """Tłumaczy w tle prawdopodobne słowa z bieżącej i kolejnych stron.
+
+    Słowa zapisane już w słowniku lub obecne w TranslationCache pomijamy,
+    resztę szeregujemy od najrzadszych (dłuższe i rzadziej powtarzane na
+    stronach) i zlecamy TranslationExecutor z niskim priorytetem - tapnięcie
+    zawsze wyprzedza prefetch. Szeregowanie (lematy, jedno zapytanie do
+    cache) działa w wątku w tle, nie w wątku Kivy. Limity zapytań i
+    wysłanych znaków na sesję pochodzą z ustawień
+    (SettingsManager.get_prefetch_settings) i liczą tylko zapytania, które
+    naprawdę ruszyły - anulowane nie zużywają limitu.
+    """
+
+    # Ile słów z jednej strony zlecamy najwyżej
+    MAX_WORDS_PER_PAGE = 20
+
+    def __init__(self, app):
+        self.app = app
+        self._requests = 0
+        self._chars = 0
+        self._seen = set()
+        self._tickets = []
+        self._generation = 0
+        self._budget_lock = threading.Lock()
+        self._trigger = Clock.create_trigger(self._prefetch, 0.5)
+
+    def schedule(self, *_):
+        """Wołane przy zmianie strony; prefetch rusza po chwili bez zmian."""
+        self._trigger()
+
+    def cancel(self):
+        # Szeregowanie w toku jest porzucane, a słowa z poprzednich stron,
+        # które jeszcze nie ruszyły, są pomijane
+        self._generation += 1
+        for key, ticket in self._tickets:
+            if not ticket.done:
+                self.app.translation_executor.cancel(ticket)
+                self._seen.discard(key)
+        self._tickets = []
+
+    def _prefetch(self, dt):
+        settings = self.app.settings.get_prefetch_settings()
+        if not settings["enabled"]:
+            return
+
+        self.cancel()
+        state = self.app.reader_state
+        pages = state.pages
+        if not pages:
+            return
+
+        model = self.app.selected_model
+        target = self.app.selected_language
+        source = self.app.translators.source_for(model)
+
+        last = min(len(pages), state.current_page + 1 + settings["pages"])
+        texts = [pages[index] for index in range(state.current_page, last)]
+        # Zbiór zapisanych słów budujemy tutaj - słownik (np. SQLite) czytamy w wątku Kivy
+        saved = self.app.dictionary.saved_words()
+        threading.Thread(
+            target=self._rank_pages,
+            args=(self._generation, texts, (model, source, target), saved, frozenset(self._seen), settings),
+            daemon=True,
+        ).start()
+
+    def _rank_pages(self, generation, texts, key, saved, seen, settings):
+        # Wątek w tle: kandydaci ze wszystkich stron, od bieżącej
+        pages = [self._count_words(text) for text in texts]
+        words = set()
+        for counts in pages:
+            words.update(word for word in counts if key + (word,) not in seen and word not in saved)
+        cached = self.app.translation_cache.cached_words(*key, words)
+
+        ranked = []
+        for counts in pages:
+            candidates = [word for word in counts if word in words and word not in cached]
+            # Rzadsze słowa to zwykle dłuższe i rzadziej powtarzane na stronie
+            candidates.sort(key=lambda w: (counts[w], -len(w)))
+            ranked.extend(candidates[:self.MAX_WORDS_PER_PAGE])
+        Clock.schedule_once(lambda dt: self._submit(generation, ranked, key, settings))
+
+    def _count_words(self, text):
+        forms = {}
+        for match in _WORD_RE.finditer(text):
+            form = self.app.translation_cache.normalize(match.group())
+            forms[form] = forms.get(form, 0) + 1
+
+        # Formy jednego słowa liczymy razem, pod lematem
+        counts = {}
+        for form, count in forms.items():
+            word = self.app.lemma_of(form)
+            counts[word] = counts.get(word, 0) + count
+        return counts
+
+    def _submit(self, generation, words, key, settings):
+        if generation != self._generation:
+            # W międzyczasie zmieniła się strona
+            return
+        executor = self.app.translation_executor
+        for word in words:
+            if self._over_budget(word, settings):
+                return
+            task_key = key + (word,)
+            if task_key in self._seen:
+                continue
+            self._seen.add(task_key)
+            ticket = executor.submit(
+                task_key,
+                lambda w=word: self._translate(w, key, settings),
+                priority=PRIORITY_PREFETCH,
+            )
+            self._tickets.append((task_key, ticket))
+
+    def _over_budget(self, word, settings):
+        return self._requests >= settings["max_requests"] or self._chars + len(word) > settings["max_chars"]
+
+    def _translate(self, word, key, settings):
+        # Wątek puli - wynik trafia tylko do cache. Limit liczymy dopiero
+        # tutaj, gdy zapytanie naprawdę rusza
+        with self._budget_lock:
+            if self._over_budget(word, settings):
+                return None
+            self._requests += 1
+            self._chars += len(word)
+
+        model, source, target = key
+        result = self.app.translators.translate(model, target, word)
+        if result:
+            self.app.translation_cache.put(model, source, target, word, result)
+        return result
@@ -0,0 +1,167 @@
+import threading
+import time
+import requests
+from deep_translator import GoogleTranslator, LingueeTranslator, PonsTranslator
+from deep_translator import google, linguee, pons
+
+# Język źródłowy przekazywany do każdego z translatorów
+TRANSLATOR_SOURCES = {
+    "GoogleTranslator": "auto",
+    "PonsTranslator": "en",
+    "LingueeTranslator": "english",
+}
+
+PONS_LANG_MAP = {
+    "en": "english",
+    "de": "german",
+    "pl": "polish",
+    "fr": "french",
+    "es": "spanish",
+    "cs": "czech",
+    "uk": "ukrainian",
+}
+
+DEFAULT_FACTORIES = {
+    "GoogleTranslator": lambda source, target: GoogleTranslator(source=source, target=target),
+    "PonsTranslator": lambda source, target: PonsTranslator(source=source, target=PONS_LANG_MAP.get(target)),
+    "LingueeTranslator": lambda source, target: LingueeTranslator(source=source, target=PONS_LANG_MAP.get(target)),
+}
+
+_local = threading.local()
+
+
+class _SessionRouter:
+    """Zamiast modułu requests w backendach deep_translator.
+
+    Klienty wołają `requests.get` z poziomu modułu - tak każde zapytanie
+    otwiera nowe połączenie (i handshake TLS). Podmieniony get idzie przez
+    sesję ustawioną przez TranslatorRegistry.translate dla bieżącego wątku;
+    poza rejestrem działa jak zwykłe requests.get.
+    """
+
+    def get(self, *args, **kwargs):
+        session = getattr(_local, "session", None)
+        if session is None:
+            return requests.get(*args, **kwargs)
+        return session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+for _module in (google, pons, linguee):
+    _module.requests = _SessionRouter()
+
+
+class TranslatorRegistry:
+    """Długo żyjące klienty tłumaczeń, jeden na (model, język docelowy).
+
+    Klient powstaje przy pierwszym użyciu i jest używany ponownie przy
+    kolejnych tapnięciach (bez walidacji języków i budowania obiektu za
+    każdym razem). `factories` pozwala podmienić backend, a `base_urls`
+    skierować istniejący backend na inny adres (np. lokalny serwer testowy).
+    Każde zapytanie do backendu (tapnięcie, prefetch, słownictwo) przechodzi
+    przez translate, więc tu trafia do `metrics` (TranslationMetrics).
+    Zapytania HTTP idą przez jedną requests.Session na model (_SessionRouter),
+    więc połączenia keep-alive i TLS są używane ponownie.
+    """
+
+    def __init__(self, factories=None, base_urls=None, metrics=None):
+        self.metrics = metrics
+        self._factories = dict(DEFAULT_FACTORIES)
+        self._factories.update(factories or {})
+        self._base_urls = dict(base_urls or {})
+        # Kopia - register(source=) nie zmienia innych rejestrów
+        self._sources = dict(TRANSLATOR_SOURCES)
+        self._clients = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def source_for(self, model):
+        return self._sources.get(model, "auto")
+
+    def register(self, model, factory, source=None):
+        """Dodaje lub podmienia backend `model` (factory(source, target) -> klient z .translate)."""
+        with self._lock:
+            self._factories[model] = factory
+            if source is not None:
+                self._sources[model] = source
+            self._drop_model(model)
+
+    def set_base_url(self, model, url):
+        with self._lock:
+            self._base_urls[model] = url
+            self._drop_model(model)
+
+    def _drop_model(self, model):
+        for key in [key for key in self._clients if key[0] == model]:
+            self._close_client(self._clients.pop(key))
+
+    @staticmethod
+    def _close_client(client):
+        # Np. OfflineTranslator trzyma zmapowane pliki .ldx
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Translator close error: {e}")
+
+    def get(self, model, target):
+        key = (model, target)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                factory = self._factories.get(model)
+                if factory is None:
+                    return None
+                client = factory(self.source_for(model), target)
+                if model in self._base_urls:
+                    # deep_translator składa adres zapytania z _base_url
+                    client._base_url = self._base_urls[model]
+                self._clients[key] = client
+            return client
+
+    def _session(self, model):
+        # Sesja przeżywa clear() - połączenia z serwerem nie zależą od języka
+        with self._lock:
+            session = self._sessions.get(model)
+            if session is None:
+                session = self._sessions[model] = requests.Session()
+            return session
+
+    def translate(self, model, target, word):
+        client = self.get(model, target)
+        if client is None:
+            return None
+        previous = getattr(_local, "session", None)
+        _local.session = self._session(model)
+        started = time.perf_counter()
+        try:
+            result = client.translate(word)
+        except Exception:
+            self._record(model, started, "error")
+            raise
+        finally:
+            _local.session = previous
+        self._record(model, started, "ok" if result else "empty")
+        return result
+
+    def _record(self, model, started, outcome):
+        if self.metrics is not None:
+            self.metrics.record_request(model, time.perf_counter() - started, outcome)
+
+    def clear(self):
+        """Zapomina klienty - po zmianie modelu lub języka w ustawieniach."""
+        with self._lock:
+            for client in self._clients.values():
+                self._close_client(client)
+            self._clients.clear()
+
+    def close(self):
+        """Zamyka klienty i sesje HTTP (koniec pracy aplikacji)."""
+        self.clear()
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+from kivy.clock import Clock
+
+_WORD_RE = re.compile(r"[^\W\d_]{2,}")
+
+# Modele, które tłumaczą wiele linii tekstu w jednym zapytaniu
+LINE_BATCH_MODELS = {"GoogleTranslator"}
+
+
+def extract_words(texts, known=None, lemma=None):
+    """Unikalne słowa (małymi literami) z tekstów, w kolejności pierwszego wystąpienia.
+
+    `known(word)` zwraca True dla słów do pominięcia (np. już w słowniku),
+    `lemma(word)` sprowadza formy odmienione do jednego lematu.
+    """
+    seen = set()
+    forms = set()
+    words = []
+    for text in texts:
+        for match in _WORD_RE.finditer(text):
+            word = match.group().lower()
+            if word in forms:
+                continue
+            forms.add(word)
+            if lemma is not None:
+                word = lemma(word)
+            if word in seen:
+                continue
+            seen.add(word)
+            if known is not None and known(word):
+                continue
+            words.append(word)
+    return words
+
+
+def chapter_range(elements, index):
+    """Zakres elementów [start, end) rozdziału zawierającego element `index`.
+
+    Rozdział zaczyna się na tytule i trwa do następnego tytułu.
+    """
+    start = index
+    while start > 0 and elements[start].get('type') != 'title':
+        start -= 1
+    end = index + 1
+    while end < len(elements) and elements[end].get('type') != 'title':
+        end += 1
+    return start, end
+
+
+class VocabularyBuilder:
+    """Zbiera słowa z tekstów i tłumaczy je partiami w wątku w tle, z limitem tempa zapytań.
+
+    Wyciąganie słów (extract_words z lematami) też działa w tym wątku -
+    teksty całej książki nie są przeglądane w wątku Kivy. `known(word)`
+    musi być bezpieczne wątkowo (np. test w gotowym zbiorze słów).
+
+    Dla modeli z LINE_BATCH_MODELS słowa łączymy w jedno zapytanie (jedno
+    słowo w linii, do `BATCH_CHARS` znaków); gdy liczba linii odpowiedzi się
+    nie zgadza, partię tłumaczymy słowo po słowie. Słowa z TranslationCache
+    nie idą do sieci. Wynik - lista (słowo, tłumaczenie) - trafia do
+    `on_complete` w wątku Kivy.
+    """
+
+    BATCH_CHARS = 4000
+    # Minimalny odstęp między zapytaniami do backendu (s)
+    MIN_INTERVAL = 1.0
+
+    def __init__(self, app, texts, on_progress, on_complete, known=None):
+        self.app = app
+        self.texts = texts
+        self.known = known
+        self.words = []
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+
+        self.model = app.selected_model
+        self.target = app.selected_language
+        self.source = app.translators.source_for(self.model)
+
+        self._cancelled = threading.Event()
+        self._last_request = 0.0
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _run(self):
+        self.words = extract_words(self.texts, known=self.known, lemma=self.app.lemma_of)
+        if self._cancelled.is_set():
+            return
+
+        cache = self.app.translation_cache
+        results = []
+        missing = []
+        for word in self.words:
+            cached = cache.get(self.model, self.source, self.target, word)
+            if cached is not None:
+                results.append((word, cached))
+            else:
+                missing.append(word)
+
+        done = len(results)
+        for batch in self._batches(missing):
+            if self._cancelled.is_set():
+                return
+            for word, translation in self._translate_batch(batch):
+                if translation:
+                    cache.put(self.model, self.source, self.target, word, translation)
+                    results.append((word, translation))
+            done += len(batch)
+            progress = done / max(1, len(self.words)) * 100
+            Clock.schedule_once(lambda dt, p=progress: self.on_progress(p))
+
+        # Kolejność jak w tekście
+        order = {word: i for i, word in enumerate(self.words)}
+        results.sort(key=lambda item: order[item[0]])
+        if not self._cancelled.is_set():
+            Clock.schedule_once(lambda dt: self.on_complete(results))
+
+    def _batches(self, words):
+        if self.model not in LINE_BATCH_MODELS:
+            for word in words:
+                yield [word]
+            return
+
+        batch, size = [], 0
+        for word in words:
+            if batch and size + len(word) + 1 > self.BATCH_CHARS:
+                yield batch
+                batch, size = [], 0
+            batch.append(word)
+            size += len(word) + 1
+        if batch:
+            yield batch
+
+    def _wait_rate_limit(self):
+        delay = self._last_request + self.MIN_INTERVAL - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_request = time.monotonic()
+
+    def _request(self, text):
+        self._wait_rate_limit()
+        try:
+            return self.app.translators.translate(self.model, self.target, text)
+        except Exception as e:
+            print(f"Batch translation error: {e}")
+            return None
+
+    def _translate_batch(self, batch):
+        if len(batch) > 1:
+            result = self._request("\n".join(batch))
+            lines = result.split("\n") if result else []
+            if len(lines) == len(batch):
+                return list(zip(batch, (line.strip() for line in lines)))
+
+        # Pojedyncze słowa (lub partia, której odpowiedź się nie zgadza)
+        pairs = []
+        for word in batch:
+            if self._cancelled.is_set():
+                break
+            pairs.append((word, self._request(word)))
+        return pairs
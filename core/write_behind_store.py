@@ -0,0 +1,50 @@
+import os
+import weakref
+from json import dump
+from kivy.clock import Clock
+from kivy.storage.jsonstore import JsonStore
+
+
+class WriteBehindJsonStore(JsonStore):
+    """JsonStore z opóźnionym zapisem.
+
+    put/delete zmieniają tylko dane w pamięci i planują zapis; kolejne zmiany
+    w ciągu `delay` sekund trafiają do pliku jednym zapisem. Plik zapisujemy
+    atomowo (plik tymczasowy + os.replace). `flush()` zapisuje od razu,
+    `flush_all()` - wszystkie sklepy (on_pause/on_stop aplikacji).
+    """
+
+    # Ile sekund czekamy na kolejne zmiany przed zapisem pliku
+    FLUSH_DELAY = 2.0
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, filename, delay=FLUSH_DELAY, **kwargs):
+        self._flush_trigger = Clock.create_trigger(lambda dt: self.flush(), delay)
+        super().__init__(filename, **kwargs)
+        WriteBehindJsonStore._instances.add(self)
+
+    def store_sync(self):
+        # Wywoływane przez put/delete po każdej zmianie - tylko planujemy zapis
+        if self._is_changed:
+            self._flush_trigger()
+
+    def flush(self):
+        """Zapisuje zaległe zmiany do pliku (od razu)."""
+        self._flush_trigger.cancel()
+        if not self._is_changed:
+            return
+
+        tmp_path = self.filename + ".tmp"
+        try:
+            with open(tmp_path, "w") as fd:
+                dump(self._data, fd, indent=self.indent, sort_keys=self.sort_keys)
+            os.replace(tmp_path, self.filename)
+            self._is_changed = False
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Store write error for {self.filename}: {e}")
+
+    @classmethod
+    def flush_all(cls):
+        for store in list(cls._instances):
+            store.flush()
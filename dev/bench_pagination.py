@@ -0,0 +1,67 @@
+import sys
+import os
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.metrics import dp
+from kivy.uix.label import Label
+
+from core.fb2_loader import load_fb2_stream
+from core.pagination_engine import PaginationEngine, MetricsPaginationEngine
+
+DEV_BOOK = os.path.join(ROOT_DIR, "dev", "test_books", "The Little Prince - Antoine de Saint-Exupéry - FB2.fb2")
+
+
+class PaginationBenchApp(App):
+    """Porównanie PaginationEngine (TextInput) z MetricsPaginationEngine na książce testowej."""
+
+    def build(self):
+        return Label(text="Pagination benchmark…")
+
+    def get_reader_height(self):
+        return Window.height - dp(130)
+
+    def on_start(self):
+        Clock.schedule_once(self.run_bench, 0)
+
+    def _run_engine(self, engine_cls, elements, repeat=3):
+        # Najlepszy z kilku przebiegów (pierwszy rozgrzewa cache szerokości w obu silnikach)
+        best = None
+        for _ in range(repeat):
+            result = {}
+            engine = engine_cls(self, list(elements), lambda p: None, lambda pages: result.setdefault("pages", pages))
+
+            start = time.perf_counter()
+            while "pages" not in result:
+                engine._paginate_step(0)
+                Clock.unschedule(engine._paginate_step)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result["pages"], best
+
+    def run_bench(self, dt):
+        elements = load_fb2_stream(DEV_BOOK)
+
+        old_pages, old_time = self._run_engine(PaginationEngine, elements)
+        new_pages, new_time = self._run_engine(MetricsPaginationEngine, elements)
+
+        print(f"TextInput engine: {len(old_pages)} pages in {old_time:.3f}s")
+        print(f"Metrics engine:   {len(new_pages)} pages in {new_time:.3f}s")
+        print(f"Speedup: {old_time / max(new_time, 1e-9):.1f}x")
+
+        # Strony porównujemy po początku tekstu (pierwsze 40 znaków bez białych znaków)
+        old_starts = {p.strip()[:40] for p in old_pages}
+        matching = sum(1 for p in new_pages if p.strip()[:40] in old_starts)
+        print(f"Matching page boundaries: {matching}/{len(new_pages)}")
+
+        self.stop()
+
+
+if __name__ == "__main__":
+    PaginationBenchApp().run()
@@ -0,0 +1,38 @@
+import sys
+import os
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.offline_dictionary import OfflineDictionary
+from core.lemmatizer import lemma_entries
+
+
+def main():
+    # Użycie: python dev/build_offline_dictionary.py slowa.tsv data/dictionaries/en-pl.ldx
+    #         python dev/build_offline_dictionary.py --lemmas lemmatization-en.txt data/lemmas/en.ldx
+    args = sys.argv[1:]
+    lemmas = "--lemmas" in args
+    if lemmas:
+        args.remove("--lemmas")
+    if len(args) != 2:
+        print("Usage: build_offline_dictionary.py [--lemmas] <input.tsv> <output.ldx>")
+        return 1
+
+    tsv_path, out_path = args
+    start = time.perf_counter()
+    entries = OfflineDictionary.read_tsv(tsv_path)
+    if lemmas:
+        entries = lemma_entries(entries)
+    OfflineDictionary.build(entries, out_path)
+
+    dictionary = OfflineDictionary(out_path)
+    print(f"{len(dictionary)} headwords -> {out_path} in {time.perf_counter() - start:.2f}s")
+    dictionary.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,27 +2,42 @@ import os
 from kivymd.app import MDApp
 from kivymd.uix.screenmanager import MDScreenManager
 from kivymd.uix.screen import MDScreen
+from kivymd.uix.dialog import MDDialog
 from kivy.metrics import dp
 from kivy.clock import Clock
 from kivy.utils import platform
 from kivy.core.window import Window
 
-from core.fb2_loader import load_fb2_simple as load_fb2
+from core.fb2_loader import load_fb2_stream as load_fb2
+from core.epub_loader import open_epub_stream
+from core.element_stream import ElementStream
 from core.reader_state import ReaderStateManager
 from core.shelf_manager import ShelfManager
 from core.dictionary_manager import DictionaryManager
 from core.settings_manager import SettingsManager
 from core.book_importer import BookImportManager
+from core.book_cache import BookCache
+from core.translation_cache import TranslationCache
+from core.lemmatizer import Lemmatizer
+from core.translation_metrics import TranslationMetrics
+from core.translator_registry import TranslatorRegistry
+from core.offline_dictionary import OfflineTranslator
+from core.translation_executor import TranslationExecutor
+from core.translation_prefetch import TranslationPrefetcher
+from core.write_behind_store import WriteBehindJsonStore
 from screens.home import HomeScreen
 from screens.shelf import ShelfScreen
 from screens.settings import SettingsScreen
 from screens.dictionary import DictionaryScreen
 from core.reader_layout import ReaderLayout
 from screens.loading_screen import LoadingScreen
-from core.pagination_engine import PaginationEngine
+from core.pagination_engine import ThreadedPaginationEngine, layout_signature
+from core.page_window import PageWindow
+from core.bulk_import import BulkImporter, folder_sources, is_book_file
 
 if platform == "android":
-    from native.android_picker import open_android_file_picker as open_file_picker, resolve_content_uri as resolve_uri
+    from native.android_picker import open_android_file_picker as open_file_picker, ContentUriStream
+    from native.android_picker import open_android_folder_picker as open_folder_picker, list_tree_documents
 
 state_file = "reader_state.json" if platform == 'android' else "dev_reader_state.json"
 
@@ -33,15 +48,34 @@ class LinguoBookApp(MDApp):
         
         self.settings = SettingsManager()
         self.selected_language = self.settings.get_language()
-        self.reader_state = ReaderStateManager(state_file)
-        self.shelf = ShelfManager()
-        self.dictionary = DictionaryManager()
+        backend = self.settings.get_storage_backend()
+        self.reader_state = ReaderStateManager(state_file, backend=backend)
+        self.shelf = ShelfManager(backend=backend)
+        self.dictionary = DictionaryManager(backend=backend)
+        self.translation_metrics = TranslationMetrics()
+        self.translators = TranslatorRegistry(metrics=self.translation_metrics)
+        self.translators.register(
+            "OfflineDictionary",
+            lambda source, target: OfflineTranslator(target, self.get_offline_dictionary_dirs()),
+            source="auto"
+        )
+        self.translation_executor = TranslationExecutor()
+        self.translation_prefetcher = TranslationPrefetcher(self)
+        self.translation_cache = TranslationCache(os.path.join(self.user_data_dir, "cache", "translations.db"))
+        self.lemmatizer = Lemmatizer(self.get_lemma_dirs())
         self.selected_model = self.settings.get_model()
         self.theme_cls.primary_palette = self.settings.get_palette()
         self.theme_cls.theme_style = self.settings.get_theme()
         
         self.delete_mode = False
         self.previous_screen = "home"
+        self.pagination_engine = None
+        self.bulk_importer = None
+        # (ID książki, elementy) - otwarta lista elementów bieżącej książki
+        self._book_elements = None
+        # Po zmianie rozmiaru okna (np. obrót ekranu) paginujemy od kotwicy
+        self._relayout_trigger = Clock.create_trigger(self._relayout, 0.3)
+        Window.bind(size=lambda *_: self._relayout_trigger())
 
         # Inicjalne ekrany (dodajemy je raz, potem tylko przełączamy)
         self.setup_screens()
@@ -106,6 +140,10 @@ class LinguoBookApp(MDApp):
         self.switch_screen("settings", direction="left")
 
     def show_reader(self):
+        if self._layout_stale():
+            # Okno zmieniło rozmiar, gdy czytnik był schowany - strony są nieaktualne
+            self._repaginate()
+            return
         self.switch_screen("reader", direction="left")
         # reader_screen_instance to ReaderLayout
         # Wywołujemy on_pre_enter, który przekaże polecenie do wewnętrznego czytnika
@@ -131,6 +169,9 @@ class LinguoBookApp(MDApp):
         )
 
     def on_start(self):
+        # Książki w katalogu bez wpisu lub bez pełnych metadanych (tylko nagłówki plików)
+        self.shelf.rebuild(BookImportManager.get_books_dir())
+
         should_open_last = self.settings.get_open_last_book()
         
         if should_open_last:
@@ -178,11 +219,67 @@ class LinguoBookApp(MDApp):
         if uri:
             Clock.schedule_once(lambda dt: self.load(uri), 0)
 
-    def load(self, uri):
-        if platform == "android" and uri.startswith("content://"):
-            uri = resolve_uri(uri)
+    def open_folder(self, *_):
+        if platform == 'android':
+            open_folder_picker(self.on_folder_selected)
+
+    def on_folder_selected(self, tree_uri):
+        if tree_uri:
+            Clock.schedule_once(lambda dt: self.import_folder(tree_uri), 0)
+
+    def import_folder(self, folder):
+        """Importuje wszystkie książki z folderu (ścieżka albo URI drzewa z Androida)."""
+        if platform == "android" and folder.startswith("content://"):
+            sources = [
+                (lambda u=uri, n=name: ContentUriStream(u, n), name)
+                for uri, name in list_tree_documents(folder) if is_book_file(name)
+            ]
+        else:
+            sources = folder_sources(folder)
+
+        self.show_loading("Importing books…")
+        self.bulk_importer = BulkImporter(sources, self._update_bulk_import_ui, self._finish_bulk_import)
+        self.loading_screen.set_cancel(self.cancel_bulk_import)
+        self.bulk_importer.start()
+
+    def cancel_bulk_import(self):
+        # Wątki kończą bieżące pliki; on_complete dostanie to, co już jest
+        if self.bulk_importer is not None:
+            self.bulk_importer.cancel()
+            self.loading_screen.status_label.text = "Cancelling…"
+
+    def _update_bulk_import_ui(self, done, total, percentage):
+        self.loading_screen.update_status(f"Importing: {done} / {total}", percentage)
+
+    def _finish_bulk_import(self, books, failed, duplicates):
+        cancelled = self.bulk_importer is not None and self.bulk_importer.cancelled
+        self.bulk_importer = None
+        self.loading_screen.set_cancel(None)
+        # Wszystkie nowe wpisy półki jednym zapisem
+        added = self.shelf.add_books(books)
+        duplicates += len(books) - added
+        print(f"Bulk import: {added} new, {duplicates} duplicates, {len(failed)} failed")
+        self.open_shelf()
+
+        lines = [f"Imported: {added}", f"Duplicates skipped: {duplicates}", f"Failed: {len(failed)}"]
+        if failed:
+            names = [os.path.basename(name) for name in failed[:5]]
+            lines.append(", ".join(names) + (" …" if len(failed) > 5 else ""))
+        self.show_message("Import cancelled" if cancelled else "Import finished", "\n".join(lines))
 
-        book = BookImportManager.import_book(uri)
+    def load(self, uri):
+        try:
+            if platform == "android" and uri.startswith("content://"):
+                # Import czyta strumień raz: hash, zapis do books/ i metadane
+                with ContentUriStream(uri) as stream:
+                    book = BookImportManager.import_stream(stream, stream.name)
+            else:
+                book = BookImportManager.import_book(uri)
+        except Exception as e:
+            # Np. ZIP bez pliku FB2 albo ucięte archiwum - load działa w callbacku Clock
+            print(f"Import error {uri}: {e}")
+            self.show_error("Import failed", str(e))
+            return
         self.shelf.add_book(book)
         
         # FIX: przekazujemy ID z importu, żeby manager stanu wiedział dokładnie co czytamy
@@ -195,25 +292,106 @@ class LinguoBookApp(MDApp):
         Clock.schedule_once(lambda dt: self._load_and_start_pagination(book["path"]), 0.1)
 
     def _load_and_start_pagination(self, uri):
-        # Najpierw sprawdź, czy mamy to w JSONie
-        if self.reader_state.load_cached_state():
-            # Skoro mamy strony i stronę, idziemy prosto do czytnika
-            self.show_reader() 
-            return
+        # Paginacja poprzedniej książki nie może dopisywać stron do tej
+        self._cancel_pagination()
+        # Słowa bez znaków diakrytycznych lematyzujemy w języku książki
+        self.lemmatizer.set_language(self.shelf.get_language(self.reader_state.current_book_id))
 
-        # JEŚLI NIE MA CACHE:
         try:
+            text = self._load_structured_book(uri)
+
+            # Najpierw sprawdź, czy mamy indeks stron dla tego układu
+            # (strumień EPUB to pierwsze otwarcie - indeksu jeszcze nie ma)
+            if (not isinstance(text, ElementStream)
+                    and self.reader_state.load_cached_state(text, layout_signature(self))):
+                # Skoro mamy strony i stronę, idziemy prosto do czytnika
+                self.show_reader()
+                return
+
+            # JEŚLI NIE MA CACHE:
             # Dopiero tutaj resetujemy parametry dla nowej paginacji
             self.reader_state.pages = []
             self.reader_state.current_page = 0
-            
-            text = load_fb2(uri)
+
             self.start_background_pagination(text)
         except Exception as e:
             print(f"Error: {e}")
             self.show_home()
 
+    def _load_structured_book(self, uri):
+        # Ta sama książka (zmiana układu, słownictwo) - ta sama otwarta lista
+        # elementów zamiast nowego mmap przy każdym wywołaniu
+        bid = self.reader_state.current_book_id
+        if bid and self._book_elements is not None and self._book_elements[0] == bid:
+            return self._book_elements[1]
+
+        elements = self._read_structured_book(bid, uri)
+        self._set_book_elements(bid, elements)
+        return elements
+
+    def _set_book_elements(self, bid, elements):
+        previous = self._book_elements
+        self._book_elements = (bid, elements) if bid else None
+        if previous is not None and previous[1] is not elements and hasattr(previous[1], "close"):
+            # CachedElements poprzedniej książki - zwalniamy mmap
+            previous[1].close()
+
+    def _read_structured_book(self, bid, uri):
+        # Sparsowana książka z cache (bez parsowania XML), inaczej FB2/EPUB + zapis do cache
+        if bid:
+            cached = BookCache.load(bid)
+            if cached is not None:
+                return cached
+
+        if uri.lower().endswith(".epub"):
+            # Rozdziały parsuje paginacja w tle; do cache trafią po jej końcu
+            return open_epub_stream(uri)
+        structured_data = load_fb2(uri)
+        if bid:
+            try:
+                BookCache.save(bid, structured_data)
+            except OSError as e:
+                print(f"Book cache write error: {e}")
+        return structured_data
+
+    def get_offline_dictionary_dirs(self):
+        # Słowniki .ldx dołączone do aplikacji i pobrane przez użytkownika
+        return [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dictionaries"),
+            os.path.join(self.user_data_dir, "dictionaries"),
+        ]
+
+    def get_lemma_dirs(self):
+        # Tablice forma -> lemat (<język>.ldx), jak słowniki offline
+        return [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lemmas"),
+            os.path.join(self.user_data_dir, "lemmas"),
+        ]
+
+    def lemma_of(self, word):
+        """Lemat słowa - klucz dla cache tłumaczeń, prefetchu i słownika.
+
+        Regularne końcówki zdejmujemy, gdy lemat jest już w słowniku
+        albo w pamięci cache tłumaczeń. Czyta tylko pamięć (zbiór zapisanych
+        słów, peek), więc można ją wołać z wątku w tle - o ile saved_words()
+        zostało już zbudowane w wątku Kivy.
+        """
+        model = self.selected_model
+        source = self.translators.source_for(model)
+        saved = self.dictionary.saved_words()
+
+        def known(candidate):
+            return (candidate in saved
+                    or self.translation_cache.peek(model, source, self.selected_language, candidate) is not None)
+
+        return self.lemmatizer.lemma(word, known)
+
+    def get_book_elements(self):
+        """Elementy bieżącej książki (z BookCache, bez ponownego parsowania)."""
+        return self._load_structured_book(self.reader_state.current_path)
+
     def show_loading(self, text="Loading…"):
+        self.loading_screen.set_cancel(None)
         self.loading_screen.update_status(text, 0)
         self.switch_screen("loading")
 
@@ -221,27 +399,160 @@ class LinguoBookApp(MDApp):
         # Resetujemy UI paska przed startem
         self.loading_screen.progress_bar.value = 0
         self.show_loading("Paginating book…")
-        
+
+        # Strona, na której czytnik może się otworzyć, gdy tylko powstanie
+        self._target_page = self.reader_state.get_saved_page()
+        # Kotwica pozycji nie zależy od układu - z nią wystarczy paginować wokół niej
+        target_anchor = self.reader_state.get_saved_anchor()
+        # Strumień (EPUB) zna tylko wczytany początek - okno stron potrzebuje całej książki
+        streaming = isinstance(structured_data, ElementStream)
+        if streaming or (target_anchor is not None and target_anchor[0] >= len(structured_data)):
+            target_anchor = None
+        self._reader_opened = False
+
         # Inicjalizacja silnika
-        self.pagination_engine = PaginationEngine(
+        self.pagination_engine = ThreadedPaginationEngine(
             app=self,
             structured_data=structured_data,
             on_progress=self._update_pagination_ui,
-            on_complete=self._finalize_pagination
+            on_complete=self._finalize_pagination,
+            on_pages=self._on_pages_available,
+            on_error=self._pagination_failed
         )
+        self.reader_state.pages = self.pagination_engine.pages
+        self.reader_state.page_starts = self.pagination_engine.page_starts
+        self.reader_state.page_tokens = self.pagination_engine.page_tokens
+        self.reader_state.layout = self.pagination_engine.layout
+        self.reader_state.pages_complete = False
+
+        if not streaming and (target_anchor is not None or PageWindow.suits(structured_data)):
+            self._open_page_window(structured_data, target_anchor)
+
         self.pagination_engine.start()
 
+    def _open_page_window(self, structured_data, anchor=None):
+        # Długa książka lub znana kotwica: czytnik od razu, paginujemy tylko
+        # kilka stron wokół pozycji, a pełna paginacja w tle uściśla numerację
+        self.pagination_engine.on_pages = None
+        window = PageWindow(
+            structured_data,
+            self.pagination_engine.layout_model,
+            anchor=anchor or (0, 0),
+            on_reindex=self._on_window_reindex
+        )
+        self.reader_state.pages = window
+
+        if anchor is not None:
+            # Okno zaczyna się dokładnie na kotwicy
+            self.reader_state.current_page = window.index_of(anchor)
+        else:
+            self.reader_state.current_page = min(self._target_page, len(window) - 1)
+            # Ustawia okno w szacowanym miejscu (może przenumerować current_page)
+            window[self.reader_state.current_page]
+
+        self._reader_opened = True
+        self.show_reader()
+
+    def _on_window_reindex(self, delta):
+        self.reader_state.current_page += delta
+
+    def _cancel_pagination(self):
+        if self.pagination_engine:
+            self.pagination_engine.cancel()
+            self.pagination_engine = None
+        self.reader_state.pages_complete = True
+
     def _update_pagination_ui(self, percentage):
         # To wywołuje silnik co klatkę
         self.loading_screen.progress_bar.value = percentage
         self.loading_screen.status_label.text = f"Paginating: {int(percentage)}%"
 
+    def _on_pages_available(self, pages):
+        if self._reader_opened:
+            self.reader_screen_instance.reader_screen.refresh_page_count()
+        elif len(pages) > self._target_page:
+            self._reader_opened = True
+            self.reader_state.current_page = self._target_page
+            self.show_reader()
+
+    def _pagination_failed(self, error):
+        self.pagination_engine = None
+        self.reader_state.pages_complete = True
+        if self._reader_opened:
+            # Czytnik zostaje przy stronach, które zdążyły powstać
+            self.reader_screen_instance.reader_screen.refresh_page_count()
+        else:
+            self.show_home()
+        self.show_error("Pagination failed", str(error))
+
+    def show_message(self, title, text):
+        MDDialog(title=title, text=text).open()
+
+    def show_error(self, title, text):
+        self.show_message(title, text)
+
+    def _save_streamed_book(self):
+        # EPUB wczytany w trakcie paginacji - przy następnym otwarciu z BookCache
+        if self._book_elements is None:
+            return
+        bid, elements = self._book_elements
+        if isinstance(elements, ElementStream) and elements.complete:
+            # Gotowa lista - kolejne paginacje (zmiana układu) nie zapisują jej ponownie
+            self._book_elements = (bid, elements.load_all())
+            try:
+                BookCache.save(bid, elements)
+            except OSError as e:
+                print(f"Book cache write error: {e}")
+
     def _finalize_pagination(self, pages):
+        self._save_streamed_book()
+        window = self.reader_state.pages
+        if isinstance(window, PageWindow):
+            # Dokładny numer strony zawierającej początek czytanej strony okna
+            anchor = window.anchor_of(self.reader_state.current_page)
+            self.reader_state.pages = pages
+            self.reader_state.current_page = self.reader_state.page_for_anchor(anchor)
+            self.reader_state.pages_complete = True
+            self.reader_state.save_page_index()
+            self.reader_screen_instance.reader_screen.update_page()
+            return
+
         self.reader_state.pages = pages
+        self.reader_state.pages_complete = True
+        self.reader_state.save_page_index()
+
+        if self._reader_opened:
+            self.reader_screen_instance.reader_screen.refresh_page_count()
+            self.reader_state.save_position()
+            return
+
         # Przywróć stronę lub zacznij od 0
         self.reader_state.current_page = self.reader_state.restore_position()
         self.show_reader()
 
+    def _layout_stale(self):
+        state = self.reader_state
+        if not state.pages or state.layout == layout_signature(self):
+            return False
+        return bool(state.current_book_id and state.current_path)
+
+    def _relayout(self, *_):
+        # Na innych ekranach tylko zostawiamy nieaktualne strony -
+        # paginujemy dopiero przy powrocie do czytnika (show_reader)
+        if self.sm.current in ("reader", "loading") and self._layout_stale():
+            self._repaginate()
+
+    def _repaginate(self):
+        # Strony są ważne tylko dla jednego układu - po zmianie zapisujemy
+        # kotwicę i paginujemy od niej (najpierw tylko okno wokół pozycji)
+        state = self.reader_state
+        state.save_position()
+        self._cancel_pagination()
+        try:
+            self.start_background_pagination(self._load_structured_book(state.current_path))
+        except Exception as e:
+            print(f"Relayout error: {e}")
+
     def get_reader_height(self):
         return Window.height - dp(130) # Uproszczony margines dla stabilności
 
@@ -254,16 +565,21 @@ class LinguoBookApp(MDApp):
             self.show_home()
 
     def clear_reader_state(self):
+        self._cancel_pagination()
         self.reader_state.current_book_id = None
         self.reader_state.pages = []
         self.reader_state.current_page = 0
 
     def on_pause(self):
         self.reader_state.save_position()
+        # System może zabić aplikację w tle - zapisujemy zaległe zmiany od razu
+        WriteBehindJsonStore.flush_all()
         return True
 
     def on_stop(self):
         self.reader_state.save_position()
+        WriteBehindJsonStore.flush_all()
+        self.translators.close()
 
 if __name__ == "__main__":
     LinguoBookApp().run()
\ No newline at end of file
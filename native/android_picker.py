@@ -1,5 +1,3 @@
-import os
-from kivy.app import App
 
 def open_android_file_picker(callback):
     from jnius import autoclass
@@ -30,26 +28,117 @@ def open_android_file_picker(callback):
     activity.bind(on_activity_result=on_activity_result)
     mActivity.startActivityForResult(intent, REQUEST_CODE)
 
-def resolve_content_uri(uri):
+def open_android_folder_picker(callback):
+    """Wybór folderu (ACTION_OPEN_DOCUMENT_TREE); callback dostaje URI drzewa albo None."""
+    from jnius import autoclass
+    from android import mActivity, activity
+
+    Intent = autoclass('android.content.Intent')
+
+    intent = Intent(Intent.ACTION_OPEN_DOCUMENT_TREE)
+    intent.addFlags(Intent.FLAG_GRANT_READ_URI_PERMISSION)
+
+    REQUEST_CODE = 1002
+
+    def on_activity_result(request_code, result_code, data):
+        if request_code != REQUEST_CODE:
+            return
+
+        activity.unbind(on_activity_result=on_activity_result)
+
+        if data is None:
+            callback(None)
+            return
+
+        uri = data.getData()
+        callback(uri.toString() if uri else None)
+
+    activity.bind(on_activity_result=on_activity_result)
+    mActivity.startActivityForResult(intent, REQUEST_CODE)
+
+def list_tree_documents(tree_uri):
+    """Pliki w wybranym folderze i podfolderach: lista (URI dokumentu, nazwa)."""
     from jnius import autoclass
     from android import mActivity
 
     Uri = autoclass('android.net.Uri')
-    parsed = Uri.parse(uri)
+    DocumentsContract = autoclass('android.provider.DocumentsContract')
+    Document = autoclass('android.provider.DocumentsContract$Document')
 
+    tree = Uri.parse(tree_uri)
     resolver = mActivity.getContentResolver()
-    stream = resolver.openInputStream(parsed)
+    columns = [Document.COLUMN_DOCUMENT_ID, Document.COLUMN_DISPLAY_NAME, Document.COLUMN_MIME_TYPE]
+
+    documents = []
+    pending = [DocumentsContract.getTreeDocumentId(tree)]
+    while pending:
+        parent_id = pending.pop()
+        children = DocumentsContract.buildChildDocumentsUriUsingTree(tree, parent_id)
+        cursor = resolver.query(children, columns, None, None, None)
+        if cursor is None:
+            continue
+        try:
+            while cursor.moveToNext():
+                doc_id, name, mime = cursor.getString(0), cursor.getString(1), cursor.getString(2)
+                if mime == Document.MIME_TYPE_DIR:
+                    pending.append(doc_id)
+                else:
+                    uri = DocumentsContract.buildDocumentUriUsingTree(tree, doc_id)
+                    documents.append((uri.toString(), name or ""))
+        finally:
+            cursor.close()
+    return documents
+
+class ContentUriStream:
+    """Odczyt content:// jak z pliku (read(n), name) - bez kopii na dysk.
+
+    Import czyta strumień raz, porcjami, prosto z ContentResolvera.
+    """
+
+    def __init__(self, uri, name=None):
+        from jnius import autoclass
+        from android import mActivity
+
+        Uri = autoclass('android.net.Uri')
+        parsed = Uri.parse(uri)
+
+        resolver = mActivity.getContentResolver()
+        self.name = name or self._display_name(resolver, parsed)
+        self._stream = resolver.openInputStream(parsed)
+        self._buf = None
+
+    @staticmethod
+    def _display_name(resolver, parsed):
+        # Nazwa pliku wybranego przez użytkownika (rozszerzenie, tytuł zastępczy)
+        try:
+            from jnius import autoclass
+            OpenableColumns = autoclass('android.provider.OpenableColumns')
+            cursor = resolver.query(parsed, None, None, None, None)
+            if cursor is not None:
+                try:
+                    if cursor.moveToFirst():
+                        name = cursor.getString(cursor.getColumnIndex(OpenableColumns.DISPLAY_NAME))
+                        if name:
+                            return name
+                finally:
+                    cursor.close()
+        except Exception as e:
+            print(f"Display name error: {e}")
+        return "book.fb2"
+
+    def read(self, size):
+        if self._buf is None or len(self._buf) != size:
+            self._buf = bytearray(size)
+        r = self._stream.read(self._buf)
+        if r == -1:
+            return b""
+        return bytes(self._buf[:r])
 
-    app_dir = App.get_running_app().user_data_dir
-    path = os.path.join(app_dir, "book.fb2")
+    def close(self):
+        self._stream.close()
 
-    with open(path, 'wb') as f:
-        buf = bytearray(8192)
-        while True:
-            r = stream.read(buf)
-            if r == -1:
-                break
-            f.write(buf[:r])
+    def __enter__(self):
+        return self
 
-    stream.close()
-    return path
\ No newline at end of file
+    def __exit__(self, *exc):
+        self.close()
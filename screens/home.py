@@ -100,6 +100,7 @@ class HomeScreen(MDNavigationLayout):
                 MDNavigationDrawerHeader(text="Menu"),
                 # DODANO: nav_to zamyka menu przed przejściem dalej
                 DrawerClickableItem(icon="book-open", text="Open Book", on_release=lambda *_: nav_to(self.app.open_file)),
+                DrawerClickableItem(icon="folder-open", text="Import Folder", on_release=lambda *_: nav_to(self.app.open_folder)),
                 DrawerClickableItem(icon="book", text="Book Shelf", on_release=lambda *_: nav_to(self.app.open_shelf)),
                 DrawerClickableItem(icon="translate", text="Dictionary", on_release=lambda *_: nav_to(self.app.open_dictionary)),
                 DrawerClickableItem(icon="cog", text="Settings", on_release=lambda *_: nav_to(self.app.open_settings)),
@@ -140,7 +141,7 @@ class HomeScreen(MDNavigationLayout):
         if recent:
             progress_data = self.app.reader_state.get_book_progress_data(recent["id"])
             current_p = progress_data.get("page", 0)
-            total_p = len(progress_data.get("pages", []))
+            total_p = progress_data.get("total", 0)
             calc_value = (current_p / total_p * 100) if total_p > 0 else 0
                 
             recent_btn = MDRectangleFlatIconButton(
@@ -2,6 +2,7 @@ from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivymd.uix.progressbar import MDProgressBar
+from kivymd.uix.button import MDFlatButton
 from kivy.metrics import dp
 
 class LoadingScreen(MDScreen):
@@ -31,6 +32,26 @@ class LoadingScreen(MDScreen):
         self.layout.add_widget(self.progress_bar)
         self.add_widget(self.layout)
 
+        # Przycisk przerwania - widoczny tylko dla operacji, które da się przerwać
+        self.cancel_button = MDFlatButton(text="CANCEL", pos_hint={"center_x": .5})
+        self._on_cancel = None
+        self.cancel_button.bind(on_release=lambda *_: self._cancel())
+
+    def set_cancel(self, callback):
+        """Pokazuje CANCEL wołające `callback`; None ukrywa przycisk."""
+        self._on_cancel = callback
+        if callback is None:
+            if self.cancel_button.parent:
+                self.layout.remove_widget(self.cancel_button)
+        elif not self.cancel_button.parent:
+            self.cancel_button.disabled = False
+            self.layout.add_widget(self.cancel_button)
+
+    def _cancel(self):
+        if self._on_cancel is not None:
+            self.cancel_button.disabled = True
+            self._on_cancel()
+
     def update_status(self, text, value):
         self.status_label.text = text
         self.progress_bar.value = value
\ No newline at end of file
@@ -7,6 +7,12 @@ from kivymd.uix.menu import MDDropdownMenu
 from kivy.uix.slider import Slider
 from kivymd.uix.screen import MDScreen
 from kivy.animation import Animation
+from kivymd.uix.dialog import MDDialog
+from kivymd.uix.button import MDFlatButton
+from kivymd.uix.list import MDList, TwoLineListItem
+from kivymd.uix.scrollview import MDScrollView
+
+from core.vocabulary import chapter_range, VocabularyBuilder
 
 from ui.reader_widgets import ReaderTextInput
 
@@ -48,7 +54,8 @@ class ReaderScreen(MDScreen):
             title=title,
             anchor_title="left", 
             left_action_items=[["menu", lambda *_: self.open_drawer()]], 
-            right_action_items = [["translate", self.open_lang_menu],
+            right_action_items = [["book-alphabet", self.open_vocabulary_menu],
+                                  ["translate", self.open_lang_menu],
                                   [theme_icon, self.switch_theme_logic]]
         )
         top_layout.add_widget(self.tool_bar)
@@ -120,6 +127,7 @@ class ReaderScreen(MDScreen):
         
         # Kluczowe: Nadpisujemy całą listę, aby KivyMD przerysowało ikonki
         self.tool_bar.right_action_items = [
+            ["book-alphabet", self.open_vocabulary_menu],
             ["translate", self.open_lang_menu],
             [new_icon, self.switch_theme_logic]
         ]
@@ -147,12 +155,12 @@ class ReaderScreen(MDScreen):
             anim.start(self.reader)
 
     def prev_page(self):
-        if self.app.reader_state.current_page > 0:
+        if self.app.reader_state.can_turn_back():
             # Animujemy wyjazd w prawo
             anim = Animation(x=Window.width, opacity=0, duration=0.15, t='in_quad')
             
             def change_text(*args):
-                self.app.reader_state.current_page -= 1
+                self.app.reader_state.turn_back()
                 self.update_page()
                 self.reader.x = -Window.width
                 final_anim = Animation(x=0, opacity=1, duration=0.15, t='out_quad')
@@ -164,9 +172,44 @@ class ReaderScreen(MDScreen):
     def update_page(self):
         current_page = self.app.reader_state.current_page
         self.reader.text = self.app.reader_state.pages[current_page]
-        self.page_label.text = f"Page {current_page + 1} / {len(self.app.reader_state.pages)}"
+        self.reader.tokens = self.app.reader_state.tokens_for(current_page)
+        self.mark_saved_words()
+        self.refresh_page_count()
         self.slider.value = current_page + 1
         self.app.reader_state.save_position()
+        self.app.translation_prefetcher.schedule()
+
+    def mark_saved_words(self):
+        """Zaznacza na stronie słowa zapisane w słowniku - raz na stronę, z TokenIndex."""
+        saved = self.app.dictionary.saved_words()
+        tokens = self.reader.tokens
+        if not saved or tokens is None or not self.app.settings.get_mark_saved_enabled():
+            self.reader.set_marks([])
+            return
+
+        # Forma jest zapisana sama albo przez swój lemat ("speaks" -> "speak")
+        lemma = self.app.lemmatizer.lemma
+        matches = {}
+        spans = []
+        for i, form in enumerate(tokens.forms):
+            hit = matches.get(form)
+            if hit is None:
+                hit = matches[form] = form in saved or lemma(form, saved.__contains__) in saved
+            if hit:
+                spans.append(tokens.span(i))
+        self.reader.set_marks(spans)
+
+    def refresh_page_count(self):
+        """Aktualizuje licznik i suwak, gdy paginacja w tle dokłada strony."""
+        pages = self.app.reader_state.pages
+        page = self.app.reader_state.current_page
+        if getattr(pages, "estimated", False):
+            # PageWindow zna tylko szacunkową liczbę stron
+            self.page_label.text = f"Page {page + 1} / ~{len(pages)}"
+        else:
+            more = "" if self.app.reader_state.pages_complete else "+"
+            self.page_label.text = f"Page {page + 1} / {len(pages)}{more}"
+        self.slider.max = max(len(pages), 1)
 
     def on_go_to_page(self, instance):
         try:
@@ -185,10 +228,12 @@ class ReaderScreen(MDScreen):
 
         if pages and page < len(pages):
             self.reader.text = pages[page]
+            self.reader.tokens = self.app.reader_state.tokens_for(page)
+            self.mark_saved_words()
             self.reader._trigger_refresh_text()
-            self.page_label.text = f"Page {page + 1} / {len(pages)}"
-            self.slider.max = len(pages)
+            self.refresh_page_count()
             self.slider.value = page + 1
+            self.app.translation_prefetcher.schedule()
             self.reader.background_color = self.theme_mode_background_color()
             self.reader.foreground_color = self.theme_mode_text_color()
 
@@ -196,6 +241,7 @@ class ReaderScreen(MDScreen):
         print(f"Language set to {lang_code}")
         self.app.selected_language = lang_code
         self.app.settings.set_language(lang_code)
+        self.app.translators.clear()
 
     def open_lang_menu(self, button_instance):
         # Najpierw aktualizujemy kolory elementów
@@ -221,6 +267,95 @@ class ReaderScreen(MDScreen):
             self.app.reader_state.current_page = page_num
             self.update_page()
     
+    # --- SŁOWNICTWO (tłumaczenie partiami) ---
+    # Ile pozycji pokazujemy w oknie wyniku (zapisujemy wszystkie)
+    VOCABULARY_PREVIEW = 300
+
+    def open_vocabulary_menu(self, *_):
+        if not self.app.reader_state.pages:
+            return
+        buttons = [
+            MDFlatButton(text=text, on_release=lambda _, s=scope: self._start_vocabulary(s))
+            for text, scope in [("PAGE", "page"), ("CHAPTER", "chapter"), ("BOOK", "book")]
+        ]
+        self.vocab_dialog = MDDialog(
+            title="Vocabulary",
+            text="Translate unknown words from:",
+            buttons=buttons,
+        )
+        self.vocab_dialog.open()
+
+    def _vocabulary_texts(self, scope):
+        state = self.app.reader_state
+        if scope == "page":
+            return [state.pages[state.current_page]]
+
+        elements = self.app.get_book_elements()
+        if scope == "book":
+            return (el.get('content', '') for el in elements)
+
+        anchor = state.current_anchor() or (0, 0)
+        start, end = chapter_range(elements, min(anchor[0], len(elements) - 1))
+        return [el.get('content', '') for el in elements[start:end]]
+
+    def _start_vocabulary(self, scope):
+        self.vocab_dialog.dismiss()
+        # Zbiór zapisanych słów powstaje tutaj, w wątku Kivy - wątek
+        # słownictwa tylko go czyta
+        saved = self.app.dictionary.saved_words()
+        self.vocab_builder = VocabularyBuilder(
+            self.app, self._vocabulary_texts(scope),
+            on_progress=self._on_vocabulary_progress,
+            on_complete=self._show_vocabulary,
+            known=lambda w: w in saved,
+        )
+        self.vocab_dialog = MDDialog(
+            title="Vocabulary",
+            text="Collecting words…",
+            buttons=[MDFlatButton(text="CANCEL", on_release=lambda *_: self._cancel_vocabulary())],
+        )
+        self.vocab_dialog.open()
+        self.vocab_builder.start()
+
+    def _on_vocabulary_progress(self, percentage):
+        self.vocab_dialog.text = f"Translating: {int(percentage)}%"
+
+    def _cancel_vocabulary(self):
+        self.vocab_builder.cancel()
+        self.vocab_dialog.dismiss()
+
+    def _show_vocabulary(self, results):
+        self.vocab_dialog.dismiss()
+        if not results:
+            text = "No translations." if self.vocab_builder.words else "No new words."
+            MDDialog(title="Vocabulary", text=text).open()
+            return
+
+        word_list = MDList()
+        for word, translation in results[:self.VOCABULARY_PREVIEW]:
+            word_list.add_widget(TwoLineListItem(text=word, secondary_text=translation))
+        scroll = MDScrollView(size_hint_y=None, height=dp(360))
+        scroll.add_widget(word_list)
+
+        more = len(results) - self.VOCABULARY_PREVIEW
+        self.vocab_dialog = MDDialog(
+            title=f"Vocabulary: {len(results)} words" + (f" (+{more} not shown)" if more > 0 else ""),
+            type="custom",
+            content_cls=scroll,
+            buttons=[
+                MDFlatButton(text="CLOSE", on_release=lambda *_: self.vocab_dialog.dismiss()),
+                MDFlatButton(text="SAVE ALL", on_release=lambda *_: self._save_vocabulary(results)),
+            ],
+        )
+        self.vocab_dialog.open()
+
+    def _save_vocabulary(self, results):
+        # Jeden zapis do słownika zamiast osobnego add dla każdego słowa
+        builder = self.vocab_builder
+        self.app.dictionary.add_many(dict(results), target=builder.target, model=builder.model)
+        self.mark_saved_words()
+        self.vocab_dialog.dismiss()
+
     def theme_mode_background_color(self):
         if self.app.theme_cls.theme_style == "Dark":
             return [0.1, 0.1, 0.1, 1]
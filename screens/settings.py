@@ -1,3 +1,4 @@
+import os
 from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.uix.list import OneLineAvatarIconListItem, MDList, OneLineIconListItem, IconLeftWidget, IRightBodyTouch
 from kivymd.uix.boxlayout import MDBoxLayout
@@ -5,6 +6,7 @@ from kivy.uix.gridlayout import GridLayout
 from kivymd.uix.scrollview import MDScrollView
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.label import MDLabel
+from kivymd.uix.button import MDFlatButton
 from kivy.metrics import dp
 from kivy.clock import Clock
 from kivymd.uix.selectioncontrol import MDCheckbox
@@ -59,6 +61,10 @@ class SettingsScreen(MDBoxLayout):
             self.last_book_check.active = self.app.settings.get_open_last_book()
         if hasattr(self, 'highlight_check'):
             self.highlight_check.active = self.app.settings.get_highlight_enabled()
+        if hasattr(self, 'prefetch_check'):
+            self.prefetch_check.active = self.app.settings.get_prefetch_settings()["enabled"]
+        if hasattr(self, 'mark_saved_check'):
+            self.mark_saved_check.active = self.app.settings.get_mark_saved_enabled()
 
     def _create_header(self, text):
         """Pomocnicza metoda do tworzenia stylowych nagłówków sekcji."""
@@ -112,6 +118,15 @@ class SettingsScreen(MDBoxLayout):
             self.btn_model.add_widget(IconLeftWidget(icon="translate"))
             self.layout_sett.add_widget(self.btn_model)
 
+            # Panel diagnostyczny: czasy, błędy i trafienia cache tłumaczeń
+            btn_metrics = OneLineAvatarIconListItem(
+                text="Translation metrics",
+                size_hint_x=0.9, pos_hint={"center_x": .5}
+            )
+            btn_metrics.bind(on_release=self.open_metrics_popup)
+            btn_metrics.add_widget(IconLeftWidget(icon="chart-box-outline"))
+            self.layout_sett.add_widget(btn_metrics)
+
         # --- SEKCJA: ZAAWANSOWANE ---
         elif step == "advanced_header":
             self.layout_sett.add_widget(self._create_header("ADVANCED"))
@@ -144,6 +159,48 @@ class SettingsScreen(MDBoxLayout):
             item_highlight.add_widget(IconLeftWidget(icon="marker"))
             item_highlight.add_widget(self.highlight_check)
             self.layout_sett.add_widget(item_highlight)
+
+            # 3. Prefetch tłumaczeń kolejnych stron
+            item_prefetch = OneLineAvatarIconListItem(
+                text="Prefetch translations",
+                _no_ripple_effect=True,
+                size_hint_x=0.9, pos_hint={"center_x": .5}
+            )
+            self.prefetch_check = RightCheckbox(
+                active=self.app.settings.get_prefetch_settings()["enabled"]
+            )
+            self.prefetch_check.bind(active=lambda cb, val: self.app.settings.set_prefetch_enabled(val))
+            item_prefetch.add_widget(IconLeftWidget(icon="download-network-outline"))
+            item_prefetch.add_widget(self.prefetch_check)
+            self.layout_sett.add_widget(item_prefetch)
+
+            # 4. Zaznaczanie słów zapisanych w słowniku
+            item_mark_saved = OneLineAvatarIconListItem(
+                text="Mark saved words",
+                _no_ripple_effect=True,
+                size_hint_x=0.9, pos_hint={"center_x": .5}
+            )
+            self.mark_saved_check = RightCheckbox(
+                active=self.app.settings.get_mark_saved_enabled()
+            )
+            self.mark_saved_check.bind(active=lambda cb, val: self.app.settings.set_mark_saved_enabled(val))
+            item_mark_saved.add_widget(IconLeftWidget(icon="bookmark-check-outline"))
+            item_mark_saved.add_widget(self.mark_saved_check)
+            self.layout_sett.add_widget(item_mark_saved)
+
+            # 5. Baza SQLite zamiast plików JSON (działa po restarcie)
+            item_sqlite = OneLineAvatarIconListItem(
+                text="SQLite storage (after restart)",
+                _no_ripple_effect=True,
+                size_hint_x=0.9, pos_hint={"center_x": .5}
+            )
+            self.sqlite_check = RightCheckbox(
+                active=self.app.settings.get_storage_backend() == "sqlite"
+            )
+            self.sqlite_check.bind(active=lambda cb, val: self.app.settings.set_storage_backend("sqlite" if val else "json"))
+            item_sqlite.add_widget(IconLeftWidget(icon="database"))
+            item_sqlite.add_widget(self.sqlite_check)
+            self.layout_sett.add_widget(item_sqlite)
         
         # --- SEKCJA: INFO ---
         elif step == "extra_info":
@@ -236,20 +293,48 @@ class SettingsScreen(MDBoxLayout):
         def choose_model(model_name, *args):
             self.app.selected_model = model_name
             self.app.settings.set_model(model_name)
+            self.app.translators.clear()
             self.btn_model.text = f"Model: {model_name}"
             dialog.dismiss()
 
         model_list = MDList()
-        for name, icon in [("GoogleTranslator", "google"), ("LingueeTranslator", "translate"), ("PonsTranslator", "book")]:
+        for name, icon in [("GoogleTranslator", "google"), ("LingueeTranslator", "translate"), ("PonsTranslator", "book"),
+                           ("OfflineDictionary", "wifi-off")]:
             item = OneLineIconListItem(text=name, on_release=lambda _, n=name: choose_model(n))
             item.add_widget(IconLeftWidget(icon=icon))
             model_list.add_widget(item)
 
-        scroll_dialog = MDScrollView(size_hint_y=None, height=dp(180))
+        scroll_dialog = MDScrollView(size_hint_y=None, height=dp(240))
         scroll_dialog.add_widget(model_list)
         dialog = MDDialog(title="Translation Model", type="custom", content_cls=scroll_dialog)
         dialog.open()
     
+    def open_metrics_popup(self, *_):
+        metrics = self.app.translation_metrics
+
+        def export(*_):
+            try:
+                path = metrics.export(os.path.join(self.app.user_data_dir, "metrics"))
+                dialog.text = f"{metrics.summary()}\n\nSaved: {path}"
+            except OSError as e:
+                print(f"Metrics export error: {e}")
+                dialog.text = f"{metrics.summary()}\n\nExport failed: {e}"
+
+        def reset(*_):
+            metrics.reset()
+            dialog.text = metrics.summary()
+
+        dialog = MDDialog(
+            title="Translation Metrics",
+            text=metrics.summary(),
+            buttons=[
+                MDFlatButton(text="RESET", on_release=reset),
+                MDFlatButton(text="EXPORT JSON", on_release=export),
+                MDFlatButton(text="CLOSE", on_release=lambda *_: dialog.dismiss()),
+            ],
+        )
+        dialog.open()
+
     def switch_theme_logic(self, *args):
         # Tylko zmiana globalna
         self.app.theme_cls.theme_style = (
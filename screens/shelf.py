@@ -84,8 +84,7 @@ class ShelfScreen(MDBoxLayout):
 
         progress_data = self.app.reader_state.get_book_progress_data(book_id)
         current_p = progress_data.get("page", 0)
-        pages_list = progress_data.get("pages", [])
-        total_p = len(pages_list)
+        total_p = progress_data.get("total", 0)
         
         calc_value = 0
         if total_p > 0:
@@ -1,29 +1,39 @@
-from kivy.uix.textinput import TextInput
+import time
+from bisect import bisect_left
+from kivy.uix.textinput import TextInput, FL_IS_LINEBREAK
+from core.token_index import TokenIndex
 from kivy.metrics import dp
 from kivy.app import App
-from deep_translator import GoogleTranslator, LingueeTranslator, PonsTranslator
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivy.uix.widget import Widget
 from kivy.clock import Clock
-import threading
+from kivy.graphics import Color, Rectangle, InstructionGroup
 from kivymd.uix.spinner import MDSpinner
 
-PONS_LANG_MAP = {
-            "en": "english",
-            "de": "german",
-            "pl": "polish",
-            "fr": "french",
-            "es": "spanish",
-            "cs": "czech",
-            "uk": "ukrainian"
-        }
+# Komunikaty zamiast tłumaczenia - bez przycisku zapisu do słownika
+UNKNOWN_MODEL_TEXT = "[Unknown translation model]"
+NO_TRANSLATION_TEXT = "[No translation]"
+NO_SAVE_TEXTS = ("[Translation error]", NO_TRANSLATION_TEXT, UNKNOWN_MODEL_TEXT)
 
 class ReaderTextInput(TextInput):
     swipe_x_threshold = dp(80)
     popup_open = False
+    # Zgłoszenie tłumaczenia dla otwartego dialogu (TranslationExecutor)
+    _translation_ticket = None
+    # Początek tapnięcia i model - do pomiaru czasu do wyniku (TranslationMetrics)
+    _tap_started = None
+    _tap_model = None
+    # TokenIndex bieżącej strony (z paginacji); None - policzymy przy tapnięciu
+    tokens = None
+    # Zakresy (start, end) słów zapisanych w słowniku i kolor ich zaznaczenia
+    marks = []
+    mark_color = (1, 0.8, 0.2, 0.3)
+    # Gotowe prostokąty zaznaczeń i stan, dla którego je policzono
+    _marks_group = None
+    _marks_state = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -41,6 +51,81 @@ class ReaderTextInput(TextInput):
         self.use_bubble = False
         self.use_handles = False
 
+    def on_text(self, instance, value):
+        # Indeks słów i zaznaczenia pasują tylko do tekstu, dla którego powstały
+        self.tokens = None
+        self.marks = []
+
+    def set_marks(self, spans):
+        """Zaznacza zakresy tekstu; rysowane przy odświeżeniu grafiki, nie co klatkę."""
+        self.marks = spans
+        self._trigger_update_graphics()
+
+    def _update_graphics_selection(self):
+        # TextInput woła to po przerysowaniu linii (zmiana tekstu, rozmiaru, zaznaczenia)
+        super()._update_graphics_selection()
+        self._draw_marks()
+
+    def _draw_marks(self):
+        self.canvas.remove_group("marks")
+        rects = self._lines_rects
+        if not self.marks or not rects:
+            return
+
+        # Geometria zależy tylko od zaznaczeń, tekstu i położenia - np. po
+        # zaznaczeniu tapniętego słowa dodajemy gotową grupę ponownie
+        state = (self.marks, self.text, tuple(self.pos), tuple(self.size), self.scroll_y, self.font_size)
+        if state != self._marks_state:
+            self._marks_group = self._build_marks(rects)
+            self._marks_state = state
+        self.canvas.add(self._marks_group)
+
+    def _build_marks(self, rects):
+        group = InstructionGroup(group="marks")
+
+        lines = self._lines
+        label_cached = self._label_cached
+
+        def width(text):
+            return self._get_text_width(text, self.tab_width, label_cached)
+
+        # Początki i końce wierszy w tekście - wiersz słowa bisekcją
+        # (jak get_cursor_from_index, ale bez przechodzenia wierszy dla każdego słowa)
+        row_starts, row_ends = [], []
+        position = 0
+        for line, flags in zip(lines, self._lines_flags):
+            if flags & FL_IS_LINEBREAK:
+                position += 1
+            row_starts.append(position)
+            position += len(line)
+            row_ends.append(position)
+
+        group.add(Color(*self.mark_color))
+        for start, end in self.marks:
+            start_row = min(bisect_left(row_ends, start), len(lines) - 1)
+            end_row = min(bisect_left(row_ends, end), len(lines) - 1)
+            # Słowo może przejść do następnej linii (np. po łączniku)
+            for row in range(start_row, min(end_row + 1, len(rects))):
+                line = lines[row]
+                col0 = start - row_starts[row] if row == start_row else 0
+                col1 = end - row_starts[row] if row == end_row else len(line)
+                x, y = rects[row].pos
+                x0 = x + width(line[:col0])
+                x1 = x + width(line[:col1])
+                group.add(Rectangle(pos=(x0, y), size=(x1 - x0, rects[row].size[1])))
+        return group
+
+    def word_at(self, x, y):
+        """(start, end, słowo) pod punktem dotyku albo None - bisekcja w TokenIndex."""
+        if self.tokens is None:
+            self.tokens = TokenIndex(self.text or "")
+        offset = self.cursor_index(self.get_cursor_from_xy(x, y))
+        i = self.tokens.find(offset)
+        if i < 0:
+            return None
+        s, e = self.tokens.span(i)
+        return s, e, self.text[s:e]
+
     # 🚫 blokada menu „Select / Copy / Paste”
     def show_cut_copy_paste(self, *args):
         return
@@ -87,21 +172,10 @@ class ReaderTextInput(TextInput):
             return res
 
         # 4. LOGIKA TŁUMACZENIA (tylko dla czystego Tapnięcia)
-        idx = self.cursor_index(self.cursor)
-        text = self.text or ""
-
-        # Znajdowanie granic słowa 
-        if idx < len(text) and not text[idx].isalpha():
-            idx -= 1
-        if idx < 0 or not text[idx].isalpha():
-            return res
-
-        s = e = idx
-        while s > 0 and text[s - 1].isalpha(): s -= 1
-        while e < len(text) and text[e].isalpha(): e += 1
-
-        word = text[s:e]
-        if word:
+        # Słowo z indeksu granic słów strony (z łącznikami i apostrofami)
+        found = self.word_at(*touch.pos)
+        if found:
+            s, e, word = found
             app = App.get_running_app()
             if app.settings.get_highlight_enabled(): 
                 Clock.schedule_once(lambda dt: self.select_text(s, e), 0)
@@ -124,31 +198,63 @@ class ReaderTextInput(TextInput):
         
         return super().on_touch_move(touch)
 
-    def translate_word(self, word):
+    def _translation_key(self):
         app = App.get_running_app()
-        target_lang = getattr(app, "selected_language", "en")
         model = getattr(app, "selected_model", "GoogleTranslator")
+        target_lang = getattr(app, "selected_language", "en")
+        return model, app.translators.source_for(model), target_lang
 
-        try:
-            if model == "GoogleTranslator":
-                return GoogleTranslator(source="auto", target=target_lang).translate(word)
+    def lookup_cached(self, word):
+        """Tłumaczenie bez sieci: cache (pamięć, dysk), potem słownik użytkownika.
 
-            elif model == "PonsTranslator":
-                target_lang = PONS_LANG_MAP.get(target_lang)
-                return PonsTranslator(source="en", target=target_lang).translate(word)
+        Wołane w wątku Kivy - słownik (np. SQLite) nie jest czytany z wątku w tle.
+        """
+        app = App.get_running_app()
+        model, source, target_lang = self._translation_key()
+
+        cached = app.translation_cache.get(model, source, target_lang, word)
+        if cached is not None:
+            return cached
+
+        entry = app.dictionary.get(word)
+        if (entry and entry.get("translation")
+                and entry.get("target") == target_lang and entry.get("model") == model):
+            # Słowo zapisane przez użytkownika w tym samym języku i modelu
+            # (inaczej tłumaczenie byłoby w starym języku) - tylko w pamięci
+            app.translation_cache.put(model, source, target_lang, word, entry["translation"], persist=False)
+            return entry["translation"]
+        return None
+
+    def translate_word(self, word, key=None):
+        # key = (model, source, target) ustalony w chwili tapnięcia
+        app = App.get_running_app()
+        model, source, target_lang = key or self._translation_key()
 
-            elif model == "LingueeTranslator":
-                target_lang = PONS_LANG_MAP.get(target_lang)
-                return LingueeTranslator(source="english", target=target_lang).translate(word)
+        if app.translators.get(model, target_lang) is None:
+            return UNKNOWN_MODEL_TEXT
 
+        try:
+            # Klient z rejestru - ten sam obiekt przy kolejnych tapnięciach;
+            # czas i wynik zapytania zapisuje sam rejestr
+            result = app.translators.translate(model, target_lang, word)
         except Exception as e:
             print(f"Translation error: {e}")
             return "[Translation error]"
 
+        # Błędów nie zapamiętujemy - następne tapnięcie spróbuje ponownie
+        if not result:
+            # Np. brak hasła w słowniku offline
+            return NO_TRANSLATION_TEXT
+        app.translation_cache.put(model, source, target_lang, word, result)
+        return result
+
     def show_word_popup(self, word):
         if self.popup_open:
             return
         self.popup_open = True
+        self._tap_started = time.perf_counter()
+        self._tap_key = self._translation_key()
+        self._tap_model = self._tap_key[0]
 
         # 1. Tworzymy kontener z kółkiem ładowania
         self.popup_content = MDBoxLayout(
@@ -190,38 +296,93 @@ class ReaderTextInput(TextInput):
         self.dialog.bind(on_dismiss=lambda *_: self._on_dialog_dismiss())
         self.dialog.open()
 
-        # 3. URUCHAMIAMY TŁUMACZENIE W TLE (Wątek)
-        threading.Thread(target=self._async_translate, args=(word,), daemon=True).start()
+        # 3. Tłumaczymy lemat ("spoken" -> "speak") - wszystkie formy słowa
+        # dzielą wpis w cache i w słowniku
+        lemma = App.get_running_app().lemma_of(word)
+        if lemma != word.lower():
+            self.word_label.text = f"{word} ({lemma})"
+
+        # 4. Najpierw cache - powtórzone słowo bez sieci i od razu.
+        # Sama forma - dla wpisów zapisanych przed lematyzacją
+        cached = self.lookup_cached(lemma)
+        if cached is None and lemma != word.lower():
+            cached = self.lookup_cached(word)
+        App.get_running_app().translation_metrics.record_cache(self._tap_model, cached is not None)
+        if cached is not None:
+            self._update_popup_with_translation(cached, lemma)
+            return
+
+        # 5. TŁUMACZENIE W TLE - pula wątków, wynik wraca w wątku Kivy
+        self._async_translate(lemma)
 
     def _async_translate(self, word):
-        # Ta metoda działa w tle
-        translated_text = self.translate_word(word)
-        # Po zakończeniu wracamy do głównego wątku Kivy, aby zaktualizować UI
-        Clock.schedule_once(lambda dt: self._update_popup_with_translation(translated_text, word))
+        app = App.get_running_app()
+        key = self._translation_key()
+        self._translation_ticket = app.translation_executor.submit(
+            key + (app.translation_cache.normalize(word),),
+            lambda: self.translate_word(word, key),
+            callback=lambda result: self._update_popup_with_translation(result, word),
+            timeout=app.translation_executor.timeout_for(key[0]),
+        )
 
     def _update_popup_with_translation(self, translated_text, word):
         # Sprawdzamy, czy popup nie został zamknięty zanim przyszło tłumaczenie
         if not self.popup_open:
             return
+        ticket = self._translation_ticket
+        self._translation_ticket = None
+        # None to przekroczony czas albo błąd zadania w puli
+        timed_out = translated_text is None and ticket is not None and ticket.expired
+        if timed_out:
+            outcome = "timeout"
+        elif translated_text == NO_TRANSLATION_TEXT:
+            outcome = "empty"
+        elif translated_text is None or translated_text in NO_SAVE_TEXTS:
+            outcome = "error"
+        else:
+            outcome = "ok"
+
+        App.get_running_app().translation_metrics.record_tap(
+            self._tap_model,
+            time.perf_counter() - self._tap_started,
+            outcome,
+        )
+
+        if translated_text is None:
+            # Bez wyniku - bez przycisku zapisu
+            self.popup_content.remove_widget(self.spinner)
+            self.translation_label.text = "[Translation timeout]" if timed_out else "[Translation error]"
+            return
 
         # Usuwamy spinner i zmieniamy tekst
         self.popup_content.remove_widget(self.spinner)
         self.translation_label.text = translated_text
+        if translated_text in NO_SAVE_TEXTS:
+            return
         self.translation_label.theme_text_color = "Primary"
 
         # Dodajemy przycisk (teraz, gdy mamy już tłumaczenie)
-        app = App.get_running_app()
         btn_add = MDRaisedButton(
             text="ADD TO DICTIONARY",
             pos_hint={'center_x': .5},
-            on_release=lambda *_: (
-                app.dictionary.add(word, translated_text),
-                self.dialog.dismiss()
-            )
+            on_release=lambda *_: self._add_to_dictionary(word, translated_text)
         )
         self.popup_content.add_widget(btn_add)
 
+    def _add_to_dictionary(self, word, translation):
+        model, _, target_lang = self._tap_key
+        App.get_running_app().dictionary.add(word, translation, target=target_lang, model=model)
+        # Nowe słowo od razu zaznaczone na bieżącej stronie
+        if getattr(self, "reader_screen", None):
+            self.reader_screen.mark_saved_words()
+        self.dialog.dismiss()
+
     def _on_dialog_dismiss(self):
         self.popup_open = False
+        # Wynik dla zamkniętego dialogu nie będzie już dostarczony
+        if self._translation_ticket is not None:
+            App.get_running_app().translation_executor.cancel(self._translation_ticket)
+            App.get_running_app().translation_metrics.record_tap(self._tap_model, 0, "cancelled")
+            self._translation_ticket = None
         # Odznaczamy tekst, gdy użytkownik zamknie okno
         self.cancel_selection()
\ No newline at end of file